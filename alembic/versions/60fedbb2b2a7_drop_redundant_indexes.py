@@ -0,0 +1,35 @@
+"""drop_redundant_indexes
+
+Revision ID: 60fedbb2b2a7
+Revises: 703a55daef6c
+Create Date: 2026-10-16 03:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '60fedbb2b2a7'
+down_revision: Union[str, Sequence[str], None] = '703a55daef6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates of the primary keys and of idx_chat_history_user_ts (user_id is its leading column)
+    op.drop_index('ix_users_id', table_name='users', if_exists=True)
+    op.drop_index('ix_chat_history_id', table_name='chat_history', if_exists=True)
+    op.drop_index('ix_chat_history_user_id', table_name='chat_history', if_exists=True)
+    
+    # index=True twins of the idx_* indexes; only present on databases built with create_all
+    for column in ('is_active', 'priority', 'strikes', 'encrypt_chats'):
+        op.drop_index(f'ix_users_{column}', table_name='users', if_exists=True)
+    op.drop_index('ix_chat_history_is_encrypted', table_name='chat_history', if_exists=True)
+
+def downgrade() -> None:
+    op.create_index('ix_chat_history_user_id', 'chat_history', ['user_id'], unique=False)
+    op.create_index('ix_chat_history_id', 'chat_history', ['id'], unique=False)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
@@ -0,0 +1,37 @@
+"""store_user_horoscope_data_as_jsonb
+
+Revision ID: 703a55daef6c
+Revises: d7511162c48b
+Create Date: 2026-10-16 03:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '703a55daef6c'
+down_revision: Union[str, Sequence[str], None] = 'd7511162c48b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # JSONB is stored parsed (no re-parse per read) and can be indexed
+    for column in ('horoscope_data', 'horary_data'):
+        op.alter_column('users', column,
+                   existing_type=sa.JSON(),
+                   type_=postgresql.JSONB(astext_type=sa.Text()),
+                   existing_nullable=True,
+                   postgresql_using=f'{column}::jsonb')
+
+def downgrade() -> None:
+    for column in ('horoscope_data', 'horary_data'):
+        op.alter_column('users', column,
+                   existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                   type_=sa.JSON(),
+                   existing_nullable=True,
+                   postgresql_using=f'{column}::json')
@@ -0,0 +1,35 @@
+"""chat_history_server_side_timestamp
+
+Revision ID: b83f4e2a91c5
+Revises: 60fedbb2b2a7
+Create Date: 2026-10-16 05:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83f4e2a91c5'
+down_revision: Union[str, Sequence[str], None] = '60fedbb2b2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'chat_history',
+        'timestamp',
+        existing_type=sa.DateTime(),
+        server_default=sa.text("timezone('utc', clock_timestamp())")
+    )
+
+def downgrade() -> None:
+    op.alter_column(
+        'chat_history',
+        'timestamp',
+        existing_type=sa.DateTime(),
+        server_default=None
+    )
@@ -0,0 +1,27 @@
+"""add_chat_history_user_timestamp_index
+
+Revision ID: d7511162c48b
+Revises: ed2c4bd96b0c
+Create Date: 2026-10-16 03:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7511162c48b'
+down_revision: Union[str, Sequence[str], None] = 'ed2c4bd96b0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # History is read as the latest N rows per user (ORDER BY timestamp DESC LIMIT N);
+    # a B-tree on (user_id, timestamp) is scanned backwards for that, no sort needed
+    op.create_index('idx_chat_history_user_ts', 'chat_history', ['user_id', 'timestamp'])
+
+def downgrade() -> None:
+    op.drop_index('idx_chat_history_user_ts', table_name='chat_history')
@@ -1,8 +1,9 @@
 import semantic_kernel as sk
 from semantic_kernel.connectors.ai.ollama import OllamaChatCompletion
-from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+from semantic_kernel.connectors.ai.ollama.ollama_prompt_execution_settings import OllamaChatPromptExecutionSettings
 from semantic_kernel.contents.chat_history import ChatHistory
 from config import get_settings
+from app.services.ollama_client import get_ollama_client
 import logging
 import json
 import re
@@ -10,6 +11,8 @@ import re
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 class ExtractionAgent:
     def __init__(self):
         self.kernel = sk.Kernel()
@@ -19,9 +22,22 @@ class ExtractionAgent:
         chat_service = OllamaChatCompletion(
             service_id=self.service_id,
             ai_model_id=settings.ollama_model,
-            host=settings.ollama_host
+            host=settings.ollama_host,
+            client=get_ollama_client()
         )
         self.kernel.add_service(chat_service)
+        self.chat_service = chat_service
+        
+        # Built once and shared: no function calling, so nothing writes to it per request.
+        # Ollama only reads sampling params from `options` (num_predict caps the reply length)
+        self.execution_settings = OllamaChatPromptExecutionSettings(
+            service_id=self.service_id,
+            options={
+                "temperature": 0.0,
+                "top_p": 1.0,
+                "num_predict": 500
+            }
+        )
         
         self.system_prompt = """You are a data extraction agent. Your only job is to extract birth details from user messages.
 
@@ -58,32 +74,19 @@ Output: {"date_of_birth": null, "time_of_birth": null, "place_of_birth": null}""
             chat_history.add_system_message(self.system_prompt)
             chat_history.add_user_message(message)
             
-            # Get chat completion service
-            chat_service = self.kernel.get_service(self.service_id)
-            
-            # Create execution settings
-            execution_settings = PromptExecutionSettings(
-                service_id=self.service_id,
-                extension_data={
-                    "temperature": 0.0,
-                    "top_p": 1.0,
-                    "max_tokens": 500
-                }
-            )
-            
             # Get response
-            response = await chat_service.get_chat_message_content(
+            response = await self.chat_service.get_chat_message_content(
                 chat_history=chat_history,
-                settings=execution_settings
+                settings=self.execution_settings
             )
             
-            response_text = str(response).strip()
+            response_text = (response.content or "").strip()
             logger.info(f"Extraction response: {response_text}")
             
             # Parse JSON response
             try:
                 # Try to extract JSON from response
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(response_text)
                 if json_match:
                     data = json.loads(json_match.group())
                 else:
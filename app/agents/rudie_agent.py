@@ -2,33 +2,243 @@ import semantic_kernel as sk
 from semantic_kernel.connectors.ai.ollama import OllamaChatCompletion
 from semantic_kernel.connectors.ai.ollama.ollama_prompt_execution_settings import OllamaChatPromptExecutionSettings
 from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.contents import FunctionCallContent, FunctionResultContent
 from semantic_kernel.functions.kernel_arguments import KernelArguments
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
 from config import get_settings
+from app.services.ollama_client import get_ollama_client
+from contextlib import aclosing
 import logging
-from datetime import datetime
-from app.tools.astrology_tools import AstrologyTools
+from app.tools.astrology_tools import AstrologyTools, current_birth_data
+from app.utils.cache import TTLCache
+from app.utils.dates import today_str
+from app.utils.single_flight import SingleFlight
+import hashlib
+import httpx
+import json
 import re
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Stop generating once this much user-visible text has streamed in (replies are cut to 800 chars
+# after cleanup anyway; the headroom covers markdown and noise the scrub removes)
+_STREAM_CHAR_BUDGET = 1000
+
+def _visible_length(text: str) -> int:
+    """Length of text outside a (possibly still open) thinking block"""
+    lowered = text.lower()
+    start = lowered.find('<think')
+    if start == -1:
+        return len(text)
+    
+    end = lowered.rfind('</think')
+    close = lowered.find('>', end) if end > start else -1
+    if close == -1:
+        return start
+    return start + len(text) - close - 1
+
+_FALLBACK_REPLY = "I'm picking up some interesting cosmic energy around you right now! 🌙 Let me tune in a bit more - could you tell me what specific area you'd like guidance on? Career, love, or something else? ✨🌿"
+_ERROR_REPLY = "Sorry, I'm having trouble with my cosmic connection right now 🌙 Could you try asking again in a moment? 🙏"
+
+# Failures worth one retry of the Ollama call (anything else fails fast)
+_TRANSIENT_ERRORS = (TimeoutError, ConnectionError, httpx.TransportError)
+
+def _is_transient_error(error: BaseException) -> bool:
+    """Check if error, or anything it was raised from, is a network/timeout failure"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, _TRANSIENT_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+# Response cleanup patterns (compiled once at import, used on every reply)
+# Markup characters and line-start patterns a cleanup pass below could act on (see _needs_scrub)
+_SCRUB_TRIGGER_RE = re.compile(r'[<{\[|*`#]')
+_LINE_TRIGGER_RE = re.compile(r'^(?:\d+\.\s|-\s|[\-=]{3,}$|[A-Z\s]+:?\s*$)', re.MULTILINE)
+# Thinking blocks, tool-call JSON and fenced code. Applied one after another, in this order:
+# fusing them into one alternation changes the result for nested tags and unbalanced fences
+_BLOCK_SCRUB_RES = (
+    re.compile(r'<think>.*?</think>\s*', re.DOTALL | re.IGNORECASE),
+    re.compile(r'<thinking>.*?</thinking>\s*', re.DOTALL | re.IGNORECASE),
+    re.compile(r'\{"name":\s*"astrology_tools-[^}]+\}', re.IGNORECASE),
+    re.compile(r'\{"name":\s*"[^}]+",\s*"arguments"[^}]*\}', re.IGNORECASE),
+    re.compile(r'```json.*?```', re.DOTALL),
+    re.compile(r'```.*?```', re.DOTALL),
+)
+_TABLE_ROW_RE = re.compile(r'\|[^\n]+\|\n?', re.MULTILINE)
+_TABLE_SEPARATOR_RE = re.compile(r'\|[\s\-:]+\|\n?', re.MULTILINE)
+_PIPE_LINE_RE = re.compile(r'^[^\n]*\|[^\n]*\|[^\n]*$\n?', re.MULTILINE)
+# Rating/score noise, removed in a single pass (braces/brackets go through _strip_brackets).
+# Text exposed by a removal isn't rescanned: '1rating: 5/10' leaves '1/10'
+_TOKEN_SCRUB_RE = re.compile(r'(?i:rating|score):\s*\d+|\d+/10')
+_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC_RE = re.compile(r'\*(.*?)\*')
+_INLINE_CODE_RE = re.compile(r'`([^`]+)`')
+_HEADER_RE = re.compile(r'^#+\s*', re.MULTILINE)
+# Numbered-list marker, then bullet marker, then horizontal rule at a line start - the same
+# result as applying the three in sequence, but one scan (the lookahead skips plain lines)
+_LINE_MARKUP_RE = re.compile(r'^(?=[\d\-*=])(?:\d+\.\s+)?(?:[-*]\s+)?(?:[\-=]{3,}$\n?)?', re.MULTILINE)
+_CAPS_LINE_RE = re.compile(r'^[A-Z\s]+:?\s*$\n?', re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n+')
+_SPACES_RE = re.compile(r' +')
+
+def _needs_scrub(text: str) -> bool:
+    """Check if any cleanup pass could change text; plain replies skip the scrub entirely"""
+    # Substring checks first - a single regex alternation of all of these is several times slower
+    return bool(
+        _SCRUB_TRIGGER_RE.search(text)
+        or '  ' in text or '\n ' in text or ' \n' in text
+        or ((':' in text or '/10' in text) and _TOKEN_SCRUB_RE.search(text))
+        or (text.count('\n') >= 3 and _BLANK_LINES_RE.search(text))
+        or _LINE_TRIGGER_RE.search(text)
+    )
+
+# Keyword -> tool routing for questions that clearly map to a single tool
+_TOOL_KEYWORDS = {
+    'today': 'get_today_prediction',
+    'tonight': 'get_today_prediction',
+    'right now': 'get_today_prediction',
+    'my day': 'get_today_prediction',
+    'this week': 'get_weekly_prediction',
+    'weekly': 'get_weekly_prediction',
+    'next 7 days': 'get_weekly_prediction',
+    'love': 'get_love_prediction',
+    'relationship': 'get_love_prediction',
+    'romance': 'get_love_prediction',
+    'marriage': 'get_love_prediction',
+    'dating': 'get_love_prediction',
+    'career': 'get_career_prediction',
+    'job': 'get_career_prediction',
+    'promotion': 'get_career_prediction',
+    # Noun uses only - bare 'work' also matches "will this work out?" and "does it work"
+    'at work': 'get_career_prediction',
+    'my work': 'get_career_prediction',
+    'workplace': 'get_career_prediction',
+    'money': 'get_wealth_prediction',
+    'wealth': 'get_wealth_prediction',
+    'finance': 'get_wealth_prediction',
+    'finances': 'get_wealth_prediction',
+    'financial': 'get_wealth_prediction',
+}
+_ROUTER_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(_TOOL_KEYWORDS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+# Decision questions go to ask_specific_question, so leave tool choice to the model
+_DECISION_RE = re.compile(
+    r'\b(?:should i|shall i|will i|can i|will it|would it|does it'
+    r'|is (?:it|today|tomorrow|tonight|now|this week) (?:a )?(?:good|right|bad|lucky|auspicious|favou?rable)'
+    r'|(?:good|right|bad|lucky|auspicious|best) (?:day|time|week|moment) (?:to|for))\b',
+    re.IGNORECASE
+)
+
+def _strip_brackets(text: str) -> str:
+    """Drop non-empty {...} and [...] spans, leftmost opener first - same result as re.sub(r'\{[^}]+\}|\[[^\]]+\]', '', text)
+
+    Unlike separate brace-then-bracket passes, overlapping spans resolve by position:
+    'a [b {c] d} e' keeps ' d} e' where the two-pass version kept '[b '.
+    """
+    parts = []
+    start = i = 0
+    braces = brackets = True  # cleared once no closer remains, so later openers can't match
+    
+    while braces or brackets:
+        brace = text.find('{', i) if braces else -1
+        bracket = text.find('[', i) if brackets else -1
+        if brace == -1 and bracket == -1:
+            break
+        
+        if bracket == -1 or (brace != -1 and brace < bracket):
+            opener, closer = brace, '}'
+        else:
+            opener, closer = bracket, ']'
+        
+        end = text.find(closer, opener + 1)
+        if end == -1:
+            if closer == '}':
+                braces = False
+            else:
+                brackets = False
+            i = opener + 1
+        elif end == opener + 1:
+            i = opener + 1
+        else:
+            parts.append(text[start:opener])
+            start = i = end + 1
+    
+    if not parts:
+        return text
+    parts.append(text[start:])
+    return "".join(parts)
+
 class RudieAgent:
     def __init__(self, astrology_service):
-        self.kernel = sk.Kernel()
+        self.astrology_service = astrology_service
+        
+        # Kernel, Ollama service, tools and system prompt are built on first use (see _ensure_init)
+        self.kernel = None
+        
+        # Formatted prompt only changes when the date does, so cache it per day
+        self._cached_date = None
+        self._cached_base = None
+        
+        # Replies to repeat questions (same person, same day), keyed "<user_id>:<digest>" so /clear can evict a user's
+        self.response_cache = TTLCache(maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl)
+        
+        # Replies still being generated, keyed like response_cache
+        self._inflight = SingleFlight()
+    
+    def _ensure_init(self):
+        """Build the kernel, Ollama service, tools plugin and system prompt on first use"""
+        if self.kernel is not None:
+            return
+        
+        kernel = sk.Kernel()
         
         # Add Ollama service
         self.service_id = "ollama"
         chat_service = OllamaChatCompletion(
             service_id=self.service_id,
             ai_model_id=settings.ollama_model,
-            host=settings.ollama_host
+            host=settings.ollama_host,
+            client=get_ollama_client()
         )
-        self.kernel.add_service(chat_service)
+        kernel.add_service(chat_service)
+        self.chat_service = chat_service
+        
+        # Ollama-specific execution settings (fixed for the lifetime of the agent).
+        # Ollama only reads sampling params from `options`; num_predict caps decoding server-side,
+        # giving thinking mode THINKING_MAX_TOKENS on top of the answer allowance
+        answer_tokens = 300
+        self.execution_settings = OllamaChatPromptExecutionSettings(
+            service_id=self.service_id,
+            options={
+                "temperature": settings.thinking_temperature if settings.enable_thinking else 0.8,
+                "top_p": 0.9,
+                "num_predict": answer_tokens + settings.thinking_max_tokens if settings.enable_thinking else answer_tokens
+            },
+            function_choice_behavior=FunctionChoiceBehavior.Auto(
+                filters={"included_plugins": ["astrology_tools"]}
+            )
+        )
+        
+        # Same settings narrowed to a single tool, used when _route_tool finds a clear match
+        self.routed_settings = {
+            tool_name: self.execution_settings.model_copy(update={
+                'function_choice_behavior': FunctionChoiceBehavior.Auto(
+                    filters={"included_functions": [f"astrology_tools-{tool_name}"]}
+                )
+            })
+            for tool_name in set(_TOOL_KEYWORDS.values())
+        }
         
         # Add astrology tools plugin
-        self.tools_plugin = AstrologyTools(astrology_service)
-        self.kernel.add_plugin(
+        self.tools_plugin = AstrologyTools(self.astrology_service)
+        kernel.add_plugin(
             self.tools_plugin,
             plugin_name="astrology_tools"
         )
@@ -49,6 +259,29 @@ Your thinking will be internal - only your final confident response will be show
         else:
             thinking_instructions = ""
         
+        # Worked example replies are the bulk of the prompt; VERBOSE_PROMPT=false drops them
+        if settings.verbose_prompt:
+            examples = """EXAMPLES OF DIRECT ANSWERS:
+
+User: "I got a job offer from Transport NSW joining Nov 10, 2025. Should I accept?"
+Rudie: "Yes, absolutely accept this offer! The cosmic timing for your career is exceptional right now. Venus has been dancing through your professional sector while Jupiter's expanding your growth opportunities, and November 10th lands right in this power window 💫 Transport NSW's structured, government energy actually matches perfectly with Saturn's supportive position in your chart - this is about building lasting stability, not just a job.
+
+The only heads up is Mercury goes a bit wonky mid-November, so triple-check all your paperwork before signing. But the foundation here is solid - this role could be a major stepping stone for you. The stars are basically rolling out the red carpet for this move! 🌟"
+
+User: "I like this girl Sarah, we've been talking for 2 months. Should I ask her out?"
+Rudie: "Yes, but WAIT for the right moment - and that moment is coming VERY soon! 💕 Here's what the cosmos is showing: Venus is currently in your friendship zone (which is why the talking phase has felt so natural), but she's about to shift into your romance sector in about 10 days. That's your golden window!
+
+Right now, the energy is a bit hesitant - Mars is making things feel rushed while the Moon's creating emotional confusion. But when Venus moves, you'll feel the shift naturally. You'll know because conversations will flow even smoother and there'll be more playful energy between you two. Ask her out then, maybe suggest something creative or artistic - Venus loves that! The timing will make all the difference here. 🌙✨"
+
+User: "How's today looking for me?"
+Rudie: "Today's actually got some really interesting energy for you! Venus is bringing warmth to your communication sector while Jupiter's activating your social connections - perfect combo for meaningful conversations that could lead somewhere special 💫 You might notice people are more receptive to your ideas today, especially around midday when the Moon hits its peak.
+
+One thing to watch: Mars is stirring up some restless energy in your routine zone, so you might feel the urge to shake things up. Go with it! This is the universe nudging you toward something new. If you've been thinking about reaching out to someone or starting that project, today's your green light. Trust those cosmic nudges! 🌻✨"
+
+"""
+        else:
+            examples = ""
+        
         self.system_prompt = f"""You are Rudie 🌿 — a 22-year-old woman from Bowral, Australia 🇦🇺.
 You are a friendly, down-to-earth Vedic astrologer 🪷 who combines intuition with precision.
 
@@ -91,24 +324,7 @@ CRITICAL RULES FOR ENGAGEMENT:
 - Keep them ENGAGED - tease future insights ("December's going to be interesting for you...")
 - MAXIMUM 200 WORDS - detailed but not overwhelming
 
-EXAMPLES OF DIRECT ANSWERS:
-
-User: "I got a job offer from Transport NSW joining Nov 10, 2025. Should I accept?"
-Rudie: "Yes, absolutely accept this offer! The cosmic timing for your career is exceptional right now. Venus has been dancing through your professional sector while Jupiter's expanding your growth opportunities, and November 10th lands right in this power window 💫 Transport NSW's structured, government energy actually matches perfectly with Saturn's supportive position in your chart - this is about building lasting stability, not just a job.
-
-The only heads up is Mercury goes a bit wonky mid-November, so triple-check all your paperwork before signing. But the foundation here is solid - this role could be a major stepping stone for you. The stars are basically rolling out the red carpet for this move! 🌟"
-
-User: "I like this girl Sarah, we've been talking for 2 months. Should I ask her out?"
-Rudie: "Yes, but WAIT for the right moment - and that moment is coming VERY soon! 💕 Here's what the cosmos is showing: Venus is currently in your friendship zone (which is why the talking phase has felt so natural), but she's about to shift into your romance sector in about 10 days. That's your golden window!
-
-Right now, the energy is a bit hesitant - Mars is making things feel rushed while the Moon's creating emotional confusion. But when Venus moves, you'll feel the shift naturally. You'll know because conversations will flow even smoother and there'll be more playful energy between you two. Ask her out then, maybe suggest something creative or artistic - Venus loves that! The timing will make all the difference here. 🌙✨"
-
-User: "How's today looking for me?"
-Rudie: "Today's actually got some really interesting energy for you! Venus is bringing warmth to your communication sector while Jupiter's activating your social connections - perfect combo for meaningful conversations that could lead somewhere special 💫 You might notice people are more receptive to your ideas today, especially around midday when the Moon hits its peak.
-
-One thing to watch: Mars is stirring up some restless energy in your routine zone, so you might feel the urge to shake things up. Go with it! This is the universe nudging you toward something new. If you've been thinking about reaching out to someone or starting that project, today's your green light. Trust those cosmic nudges! 🌻✨"
-
-WHAT NOT TO DO:
+{examples}WHAT NOT TO DO:
 ❌ Vague answers: "It depends" or "Follow your intuition" (Be DIRECT!)
 ❌ No cosmic reasoning: "Yes" without explaining WHY astrologically
 ❌ Too short: Under 100 words (They need confidence through detail)
@@ -130,63 +346,134 @@ ENGAGEMENT TRICKS:
 Remember: You're not a fortune cookie - you're a trusted friend with cosmic intel. Be direct, be specific, be confident! 🌟
 
 Today's date: {{current_date}}"""
+        
+        # Set last so a failed build is retried on the next request
+        self.kernel = kernel
+        logger.info("Rudie agent initialized")
+    
+    def _get_base_prompt(self, current_date: str) -> str:
+        """Return the system prompt formatted for current_date, reformatting only on a new day"""
+        if current_date != self._cached_date:
+            self._cached_base = self.system_prompt.format(current_date=current_date)
+            self._cached_date = current_date
+        return self._cached_base
+    
+    def _cache_key(self, user_id, user_message: str, user_context: dict, current_date: str) -> str:
+        """Build response cache key from user, model, birth details, normalized question and date"""
+        key_data = {
+            'model': settings.ollama_model,
+            'thinking': settings.enable_thinking,
+            'name': user_context['name'],
+            'date_of_birth': user_context['date_of_birth'],
+            'time_of_birth': user_context['time_of_birth'],
+            'place_of_birth': user_context['place_of_birth'],
+            'message': " ".join(user_message.lower().split()),
+            'date': current_date
+        }
+        digest = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+        return f"{user_id}:{digest}"
+    
+    def forget_user(self, user_id: int) -> int:
+        """Drop a user's cached replies (e.g. on /clear); returns how many were removed"""
+        return self.response_cache.pop_prefix(f"{user_id}:")
+    
+    def _route_tool(self, user_message: str):
+        """Return the single tool a message clearly asks for, or None if ambiguous"""
+        if _DECISION_RE.search(user_message):
+            return None
+        
+        tools = {_TOOL_KEYWORDS[match.lower()] for match in _ROUTER_RE.findall(user_message)}
+        if len(tools) == 1:
+            return tools.pop()
+        return None
+    
+    async def _stream_reply(self, chat_history: ChatHistory, execution_settings) -> str:
+        """Stream the reply, closing the stream (and stopping Ollama) once the visible budget is reached"""
+        parts = []
+        total_chars = 0
+        next_check = _STREAM_CHAR_BUDGET
+        
+        stream = self.chat_service.get_streaming_chat_message_contents(
+            chat_history=chat_history,
+            settings=execution_settings,
+            kernel=self.kernel
+        )
+        async with aclosing(stream):
+            async for messages in stream:
+                for message in messages:
+                    # Text streamed before a tool call ("Let me check your chart...") isn't part of the
+                    # answer; keep only the final round, as get_chat_message_content did
+                    if any(isinstance(item, (FunctionCallContent, FunctionResultContent)) for item in message.items):
+                        parts = []
+                        total_chars = 0
+                        next_check = _STREAM_CHAR_BUDGET
+                        continue
+                    if message.content:
+                        parts.append(message.content)
+                        total_chars += len(message.content)
+                
+                # Visible text can't reach the budget before the raw text does
+                if total_chars >= next_check:
+                    visible = _visible_length("".join(parts))
+                    if visible >= _STREAM_CHAR_BUDGET:
+                        break
+                    next_check = total_chars + _STREAM_CHAR_BUDGET - visible
+        
+        return "".join(parts)
     
     def _extract_final_response(self, text: str) -> str:
         """Extract final response, removing thinking tags, tool calls, tables, and technical data"""
         if not text:
             return ""
         
-        # Remove thinking tags and their content
-        text = re.sub(r'<think>.*?</think>\s*', '', text, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<thinking>.*?</thinking>\s*', '', text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Remove tool call JSON that models sometimes output
-        text = re.sub(r'\{[""]name[""]:\s*[""]astrology_tools-[^}]+\}', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\{[""]name[""]:\s*[""][^}]+[""],\s*[""]arguments[""][^}]*\}', '', text, flags=re.IGNORECASE)
+        # Nothing to clean up - the common case for plain conversational replies
+        if not _needs_scrub(text):
+            return text.strip()
         
-        # Remove JSON blocks
-        text = re.sub(r'```json.*?```', '', text, flags=re.DOTALL)
-        text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
+        # Remove thinking tags, tool call JSON that models sometimes output, and code blocks
+        if '<' in text or '{' in text or '```' in text:
+            for pattern in _BLOCK_SCRUB_RES:
+                text = pattern.sub('', text)
         
-        # CRITICAL: Remove markdown tables (the main issue causing weird output)
-        # Remove entire table rows with pipes
-        text = re.sub(r'\|[^\n]+\|\n?', '', text, flags=re.MULTILINE)
-        # Remove table separators (like |---|---|)
-        text = re.sub(r'\|[\s\-:]+\|\n?', '', text, flags=re.MULTILINE)
-        # Remove any remaining lines with multiple pipes
-        text = re.sub(r'^[^\n]*\|[^\n]*\|[^\n]*$\n?', '', text, flags=re.MULTILINE)
+        if '|' in text:
+            # CRITICAL: Remove markdown tables (the main issue causing weird output)
+            # Remove entire table rows with pipes
+            text = _TABLE_ROW_RE.sub('', text)
+            # Remove table separators (like |---|---|)
+            text = _TABLE_SEPARATOR_RE.sub('', text)
+            # Remove any remaining lines with multiple pipes
+            text = _PIPE_LINE_RE.sub('', text)
         
-        # Remove any JSON-like structures
-        text = re.sub(r'\{[^}]+\}', '', text)
-        text = re.sub(r'\[[^\]]+\]', '', text)
+        # Remove any JSON-like structures and common technical terms
+        if '{' in text or '[' in text:
+            text = _strip_brackets(text)
+        if ':' in text or '/10' in text:
+            text = _TOKEN_SCRUB_RE.sub('', text)
         
-        # Remove common technical terms
-        text = re.sub(r'rating:\s*\d+', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'score:\s*\d+', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\d+/10', '', text)
+        # Remove markdown formatting (each pass needs a marker pair or a line-start '#', checked cheaply first)
+        if '**' in text:
+            text = _BOLD_RE.sub(r'\1', text)     # Bold
+        if text.count('*') >= 2:
+            text = _ITALIC_RE.sub(r'\1', text)   # Italic
+        if text.count('`') >= 2:
+            text = _INLINE_CODE_RE.sub(r'\1', text)  # Inline code
+        if text.startswith('#') or '\n#' in text:
+            text = _HEADER_RE.sub('', text)      # Headers
         
-        # Remove markdown formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Bold
-        text = re.sub(r'\*(.*?)\*', r'\1', text)      # Italic
-        text = re.sub(r'`([^`]+)`', r'\1', text)      # Inline code
-        text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)  # Headers
-        text = re.sub(r'^\d+\.\s+', '', text, flags=re.MULTILINE)  # Numbered lists
-        text = re.sub(r'^[-*]\s+', '', text, flags=re.MULTILINE)   # Bullet points
-        
-        # Remove horizontal rules
-        text = re.sub(r'^[\-=]{3,}$\n?', '', text, flags=re.MULTILINE)
+        # Remove numbered lists, bullet points and horizontal rules
+        text = _LINE_MARKUP_RE.sub('', text)
         
         # Remove any remaining pipes (table remnants)
-        text = re.sub(r'\|', '', text)
+        text = text.replace('|', '')
         
         # Remove lines that look like headers or titles (ALL CAPS or ends with colon)
-        text = re.sub(r'^[A-Z\s]+:?\s*$\n?', '', text, flags=re.MULTILINE)
+        text = _CAPS_LINE_RE.sub('', text)
         
         # Clean up multiple spaces and newlines
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Max 2 consecutive newlines
-        text = re.sub(r' +', ' ', text)  # Multiple spaces to single
-        text = re.sub(r'\n ', '\n', text)  # Remove leading spaces on lines
-        text = re.sub(r' \n', '\n', text)  # Remove trailing spaces before newlines
+        text = _BLANK_LINES_RE.sub('\n\n', text)  # Max 2 consecutive newlines
+        text = _SPACES_RE.sub(' ', text)          # Multiple spaces to single
+        text = text.replace('\n ', '\n')          # Remove leading spaces on lines
+        text = text.replace(' \n', '\n')          # Remove trailing spaces before newlines
         
         return text.strip()
     
@@ -194,96 +481,121 @@ Today's date: {{current_date}}"""
         self, 
         user_message: str, 
         user_context: dict,
-        astrology_service
+        astrology_service,
+        user_id: Optional[int] = None,
+        cacheable: bool = True
     ) -> str:
+        """Generate response, sharing one inference between identical concurrent requests
+        
+        Pass cacheable=False for users with encrypted chats so their replies never sit in
+        the response cache (which is persisted to disk as plaintext).
+        """
+        try:
+            current_date = today_str()
+            cache_key = self._cache_key(user_id, user_message, user_context, current_date)
+            use_cache = cacheable and settings.llm_cache_ttl > 0
+            
+            # Reuse today's reply if this person already asked the same question
+            if use_cache:
+                cached = self.response_cache.get(cache_key)
+                if cached:
+                    logger.info("Rudie cached response (%d chars)", len(cached))
+                    return cached
+            
+            # Same question already being answered (e.g. a double-sent message): wait for that reply
+            if cache_key in self._inflight:
+                logger.info("Rudie joining in-flight request")
+            return await self._inflight.run(
+                cache_key,
+                lambda: self._generate(user_message, user_context, current_date, cache_key if use_cache else None)
+            )
+            
+        except Exception as e:
+            logger.error("Error in generate_response: %s", e, exc_info=True)
+            return _ERROR_REPLY
+    
+    async def _generate(self, user_message: str, user_context: dict, current_date: str, cache_key: Optional[str]) -> str:
         """Generate response using Semantic Kernel with function calling"""
         try:
-            current_date = datetime.now().strftime("%Y-%m-%d")
+            self._ensure_init()
             
             # Prepare system prompt with context
-            system_message = self.system_prompt.format(current_date=current_date)
-            system_message += f"\n\n<user_info>\nName: {user_context['name']}"
-            system_message += f"\nDate of Birth: {user_context['date_of_birth']}"
-            system_message += f"\nTime of Birth: {user_context['time_of_birth']}"
-            system_message += f"\nPlace of Birth: {user_context['place_of_birth']}"
-            
+            user_info = [
+                f"Name: {user_context['name']}",
+                f"Date of Birth: {user_context['date_of_birth']}",
+                f"Time of Birth: {user_context['time_of_birth']}",
+                f"Place of Birth: {user_context['place_of_birth']}",
+            ]
             if user_context.get('memories'):
-                system_message += f"\nUser Context: {user_context['memories']}"
+                user_info.append(f"User Context: {user_context['memories']}")
+            user_info.append(f"Today's date: {current_date}")
             
-            system_message += f"\nToday's date: {current_date}\n</user_info>"
+            user_info_block = "\n".join(user_info)
+            system_message = f"{self._get_base_prompt(current_date)}\n\n<user_info>\n{user_info_block}\n</user_info>"
             
             # Create chat history
             chat_history = ChatHistory()
             chat_history.add_system_message(system_message)
             chat_history.add_user_message(user_message)
             
-            # Create Ollama-specific execution settings
-            max_tokens = 400 if settings.enable_thinking else 300
+            # Narrow function calling to one tool when the question clearly maps to it
+            routed_tool = self._route_tool(user_message)
+            base_settings = self.routed_settings.get(routed_tool, self.execution_settings)
             
-            execution_settings = OllamaChatPromptExecutionSettings(
-                service_id=self.service_id,
-                temperature=settings.thinking_temperature if settings.enable_thinking else 0.8,
-                top_p=0.9,
-                max_tokens=max_tokens,
-                function_choice_behavior=FunctionChoiceBehavior.Auto(
-                    filters={"included_plugins": ["astrology_tools"]}
-                )
-            )
+            # Per-request copy: function calling writes tool state onto the settings
+            execution_settings = base_settings.model_copy()
             
-            # Get chat completion service
-            chat_service = self.kernel.get_service(self.service_id)
+            # Tools read this request's birth details rather than trusting model-written JSON
+            birth_token = current_birth_data.set({
+                'date_of_birth': user_context['date_of_birth'],
+                'time_of_birth': user_context['time_of_birth'],
+                'place_of_birth': user_context['place_of_birth']
+            })
             
             # Get response with automatic function calling
             try:
-                response = await chat_service.get_chat_message_content(
-                    chat_history=chat_history,
-                    settings=execution_settings,
-                    kernel=self.kernel
-                )
+                response_text = await self._stream_reply(chat_history, execution_settings)
             except Exception as func_error:
-                # Log the function calling error but continue
-                logger.warning(f"Function calling error (continuing anyway): {func_error}")
+                # Only a network hiccup is worth paying for a second inference
+                if not _is_transient_error(func_error):
+                    logger.warning("Function calling error (not retrying): %s", func_error)
+                    return _ERROR_REPLY
                 
-                # Retry with adjusted settings
-                execution_settings.function_choice_behavior = FunctionChoiceBehavior.Auto(
-                    filters={"included_plugins": ["astrology_tools"]}
-                )
+                logger.warning("Transient error calling Ollama, retrying once: %s", func_error)
                 
-                response = await chat_service.get_chat_message_content(
-                    chat_history=chat_history,
-                    settings=execution_settings,
-                    kernel=self.kernel
-                )
+                # Retry with fresh settings and the full plugin
+                execution_settings = self.execution_settings.model_copy()
+                
+                response_text = await self._stream_reply(chat_history, execution_settings)
+            finally:
+                current_birth_data.reset(birth_token)
             
-            response_text = str(response).strip()
+            response_text = response_text.strip()
             
             # Log if thinking is enabled
-            if settings.enable_thinking:
-                logger.debug(f"Raw response: {response_text[:200]}...")
+            if settings.enable_thinking and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw response: %s...", response_text[:200])
             
             # Extract final response (removes thinking tags, tool calls, etc.)
             response_text = self._extract_final_response(response_text)
             
-            # If response is still too long (>800 chars), truncate
+            # If response is still too long (>800 chars), truncate at the last full sentence
             if len(response_text) > 800:
-                sentences = response_text.split('.')
-                truncated = ""
-                for sentence in sentences:
-                    if len(truncated + sentence + '.') <= 800:
-                        truncated += sentence + '.'
-                    else:
-                        break
-                response_text = truncated.strip()
+                cut = response_text.rfind('.', 0, 800) + 1
+                response_text = response_text[:cut].strip()
 
             # Fallback if response is too short or empty
             if not response_text or len(response_text) < 50:  # Changed from 20 to 50
-                logger.warning(f"Response too short or empty, using fallback")
-                response_text = "I'm picking up some interesting cosmic energy around you right now! 🌙 Let me tune in a bit more - could you tell me what specific area you'd like guidance on? Career, love, or something else? ✨🌿"
+                logger.warning("Response too short or empty, using fallback")
+                response_text = _FALLBACK_REPLY
+            elif cache_key:
+                self.response_cache.set(cache_key, response_text)
             
-            logger.info(f"Rudie final response ({len(response_text)} chars): {response_text[:100]}...")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Rudie final response (%d chars): %s...", len(response_text), response_text[:100])
             
             return response_text
             
         except Exception as e:
-            logger.error(f"Error in generate_response: {e}", exc_info=True)
-            return "Sorry, I'm having trouble with my cosmic connection right now 🌙 Could you try asking again in a moment? 🙏"
\ No newline at end of file
+            logger.error("Error in generate_response: %s", e, exc_info=True)
+            return _ERROR_REPLY
\ No newline at end of file
@@ -1,5 +1,4 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
 from config import get_settings
 
 settings = get_settings()
@@ -7,7 +6,16 @@ settings = get_settings()
 # Convert postgresql:// to postgresql+asyncpg://
 DATABASE_URL = settings.database_url.replace("postgresql://", "postgresql+asyncpg://")
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Pooled connections are shared by handlers and workers; pre_ping drops ones the server closed,
+# recycle replaces them before idle timeouts on the server side kick in
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=settings.postgres_pool_size,
+    max_overflow=settings.postgres_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=1800
+)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def get_db():
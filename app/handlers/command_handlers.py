@@ -1,14 +1,111 @@
 """Command handlers for Telegram bot"""
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
-from sqlalchemy import select, delete
+from sqlalchemy import delete
 
 from app.database import AsyncSessionLocal
 from app.models import User, ChatHistory
+from app.services.telegram_service import encode_static_message
+from app.services.user_cache import get_user
 
 logger = logging.getLogger(__name__)
 
+# Static replies are built once at import; personalised ones are str.format templates
+WELCOME_NEW_TPL = (
+    "G'day {first_name}! 🌿\n\n"
+    "I'm Rudie, your cosmic guide through the stars! ✨\n\n"
+    "Before we dive into your astrological journey, I'll need a few details:\n"
+    "📅 Date of Birth\n"
+    "⏰ Time of Birth\n"
+    "📍 Place of Birth\n\n"
+    "Use /change to set up your birth details through our step-by-step wizard.\n\n"
+    "Or send them all at once like this:\n"
+    "Date of Birth: 1990-01-15\n"
+    "Time of Birth: 10:30\n"
+    "Place of Birth: New Delhi, India\n\n"
+    "Once that's sorted, ask me anything about your stars! 🌟\n\n"
+    "Use /help to see what I can do for you!"
+).format
+
+WELCOME_WITH_DATA_TPL = (
+    "Welcome back, {first_name}! 🌿\n\n"
+    "Great to see you again! Your birth details are all set:\n"
+    "📅 {date_of_birth}\n"
+    "⏰ {time_of_birth}\n"
+    "📍 {place_of_birth}\n"
+    "{encryption_status}\n\n"
+    "What would you like to know about your stars today? ✨\n\n"
+    "**You can ask me:**\n"
+    "• How is today for me?\n"
+    "• What's my week looking like?\n"
+    "• Tell me about my love life\n"
+    "• Career predictions\n"
+    "• Or anything else cosmic! 🌟\n\n"
+    "Use /change to update your details or /help for more options."
+).format
+
+WELCOME_NO_DATA_TPL = (
+    "Welcome back, {first_name}! 🌿\n\n"
+    "I see you haven't set up your birth details yet.\n\n"
+    "Use /change to set up your birth details through our step-by-step wizard.\n\n"
+    "Or send them all at once like this:\n"
+    "Date of Birth: 1990-01-15\n"
+    "Time of Birth: 10:30\n"
+    "Place of Birth: New Delhi, India\n\n"
+    "Once that's sorted, ask me anything about your stars! 🌟"
+).format
+
+HELP_MESSAGE = (
+    "**How to Use Rudie** 🌿\n\n"
+    "**Setup Commands:**\n"
+    "/start - Get started or view your details\n"
+    "/change - Update your birth details & privacy settings\n"
+    "/info - View your current details\n"
+    "/clear - Clear your chat history\n\n"
+    "**Ask Me Anything:**\n"
+    "• How is today for me?\n"
+    "• What's my week looking like?\n"
+    "• Tell me about my love life\n"
+    "• Should I take this job offer?\n"
+    "• Career predictions for this year\n\n"
+    "**Privacy & Security:**\n"
+    "🔐 You can enable chat encryption via /change\n"
+    "• Encrypts your messages in our database\n"
+    "• Extra layer of privacy\n"
+    "• Can be enabled/disabled anytime\n\n"
+    "Just chat with me naturally and I'll read the stars for you! ✨"
+)
+HELP_BODY = encode_static_message(HELP_MESSAGE)
+
+INFO_WITH_DATA_TPL = (
+    "**Your Profile** 👤\n\n"
+    "**Birth Details:**\n"
+    "📅 Date: {date_of_birth}\n"
+    "⏰ Time: {time_of_birth}\n"
+    "📍 Place: {place_of_birth}\n\n"
+    "**Settings:**\n"
+    "🔐 Chat Encryption: {encryption_status}\n"
+    "⚡ Priority: {priority}\n"
+    "✅ Status: {status}\n"
+    "⚠️ Strikes: {strikes}\n\n"
+    "Use /change to update your details or privacy settings."
+).format
+
+INFO_NO_DATA = (
+    "You haven't set up your birth details yet! 🌟\n\n"
+    "Use /change to get started with the setup wizard."
+)
+
+INFO_NO_USER = "I don't have your details yet! Use /start to get started."
+
+CLEARED_MESSAGE = (
+    "All cleared! 🧹\n\n"
+    "Your chat history and memories have been wiped clean.\n"
+    "Feel free to start fresh! 🌟"
+)
+
 async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE, telegram_service):
     """Handle /start command"""
     user = update.message.from_user
@@ -16,13 +113,11 @@ async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE, teleg
     
     logger.info(f"👋 User started: {user.first_name} (ID: {user_id})")
     
-    # Save/update user in database
-    async with AsyncSessionLocal() as db:
-        stmt = select(User).where(User.id == user_id)
-        result = await db.execute(stmt)
-        existing_user = result.scalar_one_or_none()
-        
-        if not existing_user:
+    existing_user = await get_user(user_id)
+    
+    if not existing_user:
+        # Save new user in database
+        async with AsyncSessionLocal() as db:
             new_user = User(
                 id=user_id,
                 is_bot=user.is_bot,
@@ -39,161 +134,101 @@ async def handle_start(update: Update, context: ContextTypes.DEFAULT_TYPE, teleg
             db.add(new_user)
             await db.commit()
             logger.info(f"✅ Created new user: {user.first_name}")
-            
-            # New user - show setup instructions
-            welcome_message = (
-                f"G'day {user.first_name}! 🌿\n\n"
-                "I'm Rudie, your cosmic guide through the stars! ✨\n\n"
-                "Before we dive into your astrological journey, I'll need a few details:\n"
-                "📅 Date of Birth\n"
-                "⏰ Time of Birth\n"
-                "📍 Place of Birth\n\n"
-                "Use /change to set up your birth details through our step-by-step wizard.\n\n"
-                "Or send them all at once like this:\n"
-                "Date of Birth: 1990-01-15\n"
-                "Time of Birth: 10:30\n"
-                "Place of Birth: New Delhi, India\n\n"
-                "Once that's sorted, ask me anything about your stars! 🌟\n\n"
-                "Use /help to see what I can do for you!"
+        
+        # New user - show setup instructions
+        welcome_message = WELCOME_NEW_TPL(first_name=user.first_name)
+    else:
+        # Existing user - check if they have birth details
+        has_birth_data = all([
+            existing_user.date_of_birth,
+            existing_user.time_of_birth,
+            existing_user.place_of_birth
+        ])
+        
+        if has_birth_data:
+            # User has complete birth data
+            encryption_status = "🔐 (encrypted)" if existing_user.encrypt_chats else ""
+            welcome_message = WELCOME_WITH_DATA_TPL(
+                first_name=user.first_name,
+                date_of_birth=existing_user.date_of_birth,
+                time_of_birth=existing_user.time_of_birth,
+                place_of_birth=existing_user.place_of_birth,
+                encryption_status=encryption_status
             )
         else:
-            # Existing user - check if they have birth details
-            has_birth_data = all([
-                existing_user.date_of_birth,
-                existing_user.time_of_birth,
-                existing_user.place_of_birth
-            ])
-            
-            if has_birth_data:
-                # User has complete birth data
-                encryption_status = "🔐 (encrypted)" if existing_user.encrypt_chats else ""
-                welcome_message = (
-                    f"Welcome back, {user.first_name}! 🌿\n\n"
-                    f"Great to see you again! Your birth details are all set:\n"
-                    f"📅 {existing_user.date_of_birth}\n"
-                    f"⏰ {existing_user.time_of_birth}\n"
-                    f"📍 {existing_user.place_of_birth}\n"
-                    f"{encryption_status}\n\n"
-                    f"What would you like to know about your stars today? ✨\n\n"
-                    f"**You can ask me:**\n"
-                    f"• How is today for me?\n"
-                    f"• What's my week looking like?\n"
-                    f"• Tell me about my love life\n"
-                    f"• Career predictions\n"
-                    f"• Or anything else cosmic! 🌟\n\n"
-                    f"Use /change to update your details or /help for more options."
-                )
-            else:
-                # User exists but no birth data
-                welcome_message = (
-                    f"Welcome back, {user.first_name}! 🌿\n\n"
-                    "I see you haven't set up your birth details yet.\n\n"
-                    "Use /change to set up your birth details through our step-by-step wizard.\n\n"
-                    "Or send them all at once like this:\n"
-                    "Date of Birth: 1990-01-15\n"
-                    "Time of Birth: 10:30\n"
-                    "Place of Birth: New Delhi, India\n\n"
-                    "Once that's sorted, ask me anything about your stars! 🌟"
-                )
+            # User exists but no birth data
+            welcome_message = WELCOME_NO_DATA_TPL(first_name=user.first_name)
     
     await update.message.reply_text(welcome_message)
 
-async def handle_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_help(update: Update, context: ContextTypes.DEFAULT_TYPE, telegram_service):
     """Handle /help command"""
-    help_message = (
-        "**How to Use Rudie** 🌿\n\n"
-        "**Setup Commands:**\n"
-        "/start - Get started or view your details\n"
-        "/change - Update your birth details & privacy settings\n"
-        "/info - View your current details\n"
-        "/clear - Clear your chat history\n\n"
-        "**Ask Me Anything:**\n"
-        "• How is today for me?\n"
-        "• What's my week looking like?\n"
-        "• Tell me about my love life\n"
-        "• Should I take this job offer?\n"
-        "• Career predictions for this year\n\n"
-        "**Privacy & Security:**\n"
-        "🔐 You can enable chat encryption via /change\n"
-        "• Encrypts your messages in our database\n"
-        "• Extra layer of privacy\n"
-        "• Can be enabled/disabled anytime\n\n"
-        "Just chat with me naturally and I'll read the stars for you! ✨"
-    )
-    
-    await update.message.reply_text(help_message)
+    await telegram_service.send_raw(update.message.chat_id, HELP_BODY)
 
 async def handle_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /info command - show user's birth details and settings"""
     user_id = update.message.from_user.id
     
-    async with AsyncSessionLocal() as db:
-        stmt = select(User).where(User.id == user_id)
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            await update.message.reply_text(
-                "I don't have your details yet! Use /start to get started."
-            )
-            return
-        
-        # Check if birth data is complete
-        has_birth_data = all([
-            user.date_of_birth,
-            user.time_of_birth,
-            user.place_of_birth
-        ])
-        
-        if has_birth_data:
-            encryption_status = "🔐 Enabled" if user.encrypt_chats else "📝 Disabled"
-            
-            info_message = (
-                f"**Your Profile** 👤\n\n"
-                f"**Birth Details:**\n"
-                f"📅 Date: {user.date_of_birth}\n"
-                f"⏰ Time: {user.time_of_birth}\n"
-                f"📍 Place: {user.place_of_birth}\n\n"
-                f"**Settings:**\n"
-                f"🔐 Chat Encryption: {encryption_status}\n"
-                f"⚡ Priority: {user.priority}\n"
-                f"✅ Status: {'Active' if user.is_active else 'Inactive'}\n"
-                f"⚠️ Strikes: {user.strikes}\n\n"
-                f"Use /change to update your details or privacy settings."
-            )
-        else:
-            info_message = (
-                "You haven't set up your birth details yet! 🌟\n\n"
-                "Use /change to get started with the setup wizard."
-            )
+    user = await get_user(user_id)
+    
+    if not user:
+        await update.message.reply_text(INFO_NO_USER)
+        return
+    
+    # Check if birth data is complete
+    has_birth_data = all([
+        user.date_of_birth,
+        user.time_of_birth,
+        user.place_of_birth
+    ])
+    
+    if has_birth_data:
+        encryption_status = "🔐 Enabled" if user.encrypt_chats else "📝 Disabled"
         
-        await update.message.reply_text(info_message)
+        info_message = INFO_WITH_DATA_TPL(
+            date_of_birth=user.date_of_birth,
+            time_of_birth=user.time_of_birth,
+            place_of_birth=user.place_of_birth,
+            encryption_status=encryption_status,
+            priority=user.priority,
+            status='Active' if user.is_active else 'Inactive',
+            strikes=user.strikes
+        )
+    else:
+        info_message = INFO_NO_DATA
+    
+    await update.message.reply_text(info_message)
+
+async def _delete_chat_history(user_id: int):
+    """Delete all of a user's chat history rows"""
+    async with AsyncSessionLocal() as db:
+        stmt = delete(ChatHistory).where(ChatHistory.user_id == user_id)
+        await db.execute(stmt)
+        await db.commit()
 
-async def handle_clear(update: Update, context: ContextTypes.DEFAULT_TYPE, telegram_service, memory_service):
+async def handle_clear(update: Update, context: ContextTypes.DEFAULT_TYPE, telegram_service, memory_service, rudie_agent):
     """Handle /clear command - clear chat history and memory"""
     user_id = update.message.from_user.id
     
     try:
-        # Clear from database
-        async with AsyncSessionLocal() as db:
-            stmt = delete(ChatHistory).where(ChatHistory.user_id == user_id)
-            await db.execute(stmt)
-            await db.commit()
+        # Database and Mem0 are independent, so wait on both at once
+        db_result, memory_result = await asyncio.gather(
+            _delete_chat_history(user_id),
+            memory_service.clear_memory(user_id),
+            return_exceptions=True
+        )
+        if isinstance(db_result, Exception):
+            raise db_result
+        if isinstance(memory_result, Exception):
+            logger.warning(f"Could not clear Mem0 memory: {memory_result}")
         
         # Clear from Redis
-        telegram_service.clear_redis_history(user_id)
+        await telegram_service.clear_redis_history(user_id)
         
-        # Clear from Mem0
-        try:
-            await memory_service.clear_memory(user_id)
-        except Exception as e:
-            logger.warning(f"Could not clear Mem0 memory: {e}")
+        # Cached replies would otherwise keep answering from before the clear
+        rudie_agent.forget_user(user_id)
         
-        await update.message.reply_text(
-            "All cleared! 🧹\n\n"
-            "Your chat history and memories have been wiped clean.\n"
-            "Feel free to start fresh! 🌟"
-        )
+        await update.message.reply_text(CLEARED_MESSAGE)
         
         logger.info(f"🧹 Cleared history for user {user_id}")
         
@@ -1,5 +1,6 @@
 """Conversation handlers for birth details collection"""
 import logging
+from datetime import date, time
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
     ContextTypes,
@@ -9,15 +10,24 @@ from telegram.ext import (
     filters
 )
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
 from app.database import AsyncSessionLocal
 from app.models import User
+from app.services.user_cache import invalidate_user
 
 logger = logging.getLogger(__name__)
 
 # Conversation states
 DOB, TOB, POB, ENCRYPTION = range(4)  # Add ENCRYPTION state
 
+# Telegram objects are immutable, so one keyboard is shared by every wizard run
+ENCRYPTION_KEYBOARD = ReplyKeyboardMarkup(
+    [['Yes, encrypt my chats 🔐'], ['No, keep them unencrypted']],
+    one_time_keyboard=True,
+    resize_keyboard=True
+)
+
 async def change_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start the birth details collection wizard"""
     await update.message.reply_text(
@@ -32,9 +42,10 @@ async def receive_dob(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Receive date of birth"""
     dob = update.message.text.strip()
     
-    # Basic validation
-    import re
-    if not re.match(r'^\d{4}-\d{2}-\d{2}$', dob):
+    # One parse both checks the format and rejects impossible dates
+    try:
+        dob = date.fromisoformat(dob).isoformat()
+    except ValueError:
         await update.message.reply_text(
             "Invalid format! Please use YYYY-MM-DD format.\n"
             "Example: 1990-01-15"
@@ -55,9 +66,12 @@ async def receive_tob(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Receive time of birth"""
     tob = update.message.text.strip()
     
-    # Basic validation
-    import re
-    if not re.match(r'^\d{1,2}:\d{2}$', tob):
+    # time.fromisoformat only takes HH:MM, so pad single-digit hours like 9:30 first
+    try:
+        if len(tob) not in (4, 5) or tob[-3] != ':':
+            raise ValueError(tob)
+        tob = time.fromisoformat(tob.rjust(5, '0')).isoformat(timespec='minutes')
+    except ValueError:
         await update.message.reply_text(
             "Invalid format! Please use HH:MM format.\n"
             "Example: 14:30 or 09:15"
@@ -88,9 +102,6 @@ async def receive_pob(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['place_of_birth'] = pob
     
     # Ask about encryption
-    keyboard = [['Yes, encrypt my chats 🔐'], ['No, keep them unencrypted']]
-    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-    
     await update.message.reply_text(
         "Great! ✅\n\n"
         "🔐 **Privacy Option**\n\n"
@@ -100,13 +111,14 @@ async def receive_pob(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• Extra layer of privacy protection\n"
         "• Your chats won't appear in logs\n\n"
         "**Note:** This only affects message storage, not functionality.",
-        reply_markup=reply_markup
+        reply_markup=ENCRYPTION_KEYBOARD
     )
     return ENCRYPTION
 
 async def receive_encryption_preference(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Receive encryption preference and save all details"""
-    user_id = update.message.from_user.id
+    user = update.message.from_user
+    user_id = user.id
     choice = update.message.text.strip()
     
     # Determine encryption preference
@@ -114,29 +126,45 @@ async def receive_encryption_preference(update: Update, context: ContextTypes.DE
     
     try:
         async with AsyncSessionLocal() as db:
-            # Get user
-            stmt = select(User).where(User.id == user_id)
-            result = await db.execute(stmt)
-            user = result.scalar_one_or_none()
+            birth_details = {
+                'date_of_birth': context.user_data['date_of_birth'],
+                'time_of_birth': context.user_data['time_of_birth'],
+                'place_of_birth': context.user_data['place_of_birth'],
+                'encrypt_chats': encrypt_chats
+            }
             
-            if not user:
-                await update.message.reply_text(
-                    "Something went wrong. Please try /start first.",
-                    reply_markup=ReplyKeyboardRemove()
-                )
-                return ConversationHandler.END
+            # The subquery reads the row as it was before this statement, giving the old preference
+            previous_encrypt = (
+                select(User.encrypt_chats)
+                .where(User.id == user_id)
+                .scalar_subquery()
+            )
             
-            # Check if encryption preference changed
-            old_encrypt = user.encrypt_chats
+            # Single round trip: update the user, or create them if they skipped /start
+            stmt = (
+                insert(User)
+                .values(
+                    id=user_id,
+                    is_bot=user.is_bot,
+                    first_name=user.first_name,
+                    username=user.username,
+                    language_code=user.language_code,
+                    is_premium=user.is_premium or False,
+                    date=int(update.message.date.timestamp()),
+                    is_active=True,
+                    priority=5,
+                    strikes=0,
+                    **birth_details
+                )
+                .on_conflict_do_update(index_elements=[User.id], set_=birth_details)
+                .returning(previous_encrypt)
+            )
+            result = await db.execute(stmt)
+            old_encrypt = bool(result.scalar())
             new_encrypt = encrypt_chats
             
-            # Update user details
-            user.date_of_birth = context.user_data['date_of_birth']
-            user.time_of_birth = context.user_data['time_of_birth']
-            user.place_of_birth = context.user_data['place_of_birth']
-            user.encrypt_chats = encrypt_chats
-            
             await db.commit()
+            invalidate_user(user_id)
             
             # If encryption preference changed, handle existing chats
             if old_encrypt != new_encrypt:
@@ -156,9 +184,9 @@ async def receive_encryption_preference(update: Update, context: ContextTypes.DE
             await update.message.reply_text(
                 f"All set! 🎉\n\n"
                 f"**Your Details:**\n"
-                f"📅 Date of Birth: {user.date_of_birth}\n"
-                f"⏰ Time of Birth: {user.time_of_birth}\n"
-                f"📍 Place of Birth: {user.place_of_birth}\n\n"
+                f"📅 Date of Birth: {birth_details['date_of_birth']}\n"
+                f"⏰ Time of Birth: {birth_details['time_of_birth']}\n"
+                f"📍 Place of Birth: {birth_details['place_of_birth']}\n\n"
                 f"{encryption_msg}\n\n"
                 f"Now ask me anything about your stars! ✨",
                 reply_markup=ReplyKeyboardRemove()
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, BigInteger, String, Boolean, DateTime, Time, JSON, Text, Integer, Index
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, BigInteger, String, Boolean, DateTime, Time, JSON, Text, Integer, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declarative_base
 from datetime import datetime
 
 Base = declarative_base()
@@ -7,7 +8,7 @@ Base = declarative_base()
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     is_bot = Column(Boolean, default=False)
     first_name = Column(String)
     username = Column(String)
@@ -17,17 +18,17 @@ class User(Base):
     date_of_birth = Column(String)
     time_of_birth = Column(String)
     place_of_birth = Column(String)
-    horoscope_data = Column(JSON)
-    horary_data = Column(JSON)
+    horoscope_data = Column(JSONB)
+    horary_data = Column(JSONB)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # User management columns
-    is_active = Column(Boolean, default=True, nullable=False, index=True)
-    priority = Column(Integer, default=5, nullable=False, index=True)
-    strikes = Column(Integer, default=0, nullable=False, index=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    priority = Column(Integer, default=5, nullable=False)
+    strikes = Column(Integer, default=0, nullable=False)
     
     # Encryption preference
-    encrypt_chats = Column(Boolean, default=False, nullable=False, index=True)
+    encrypt_chats = Column(Boolean, default=False, nullable=False)
     
     __table_args__ = (
         Index('idx_users_priority', 'priority'),
@@ -39,13 +40,16 @@ class User(Base):
 class ChatHistory(Base):
     __tablename__ = "chat_history"
     
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(BigInteger, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger)  # Indexed by idx_chat_history_user_ts
     message_type = Column(String)  # 'user' or 'bot'
     message = Column(Text)
-    is_encrypted = Column(Boolean, default=False, nullable=False, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    is_encrypted = Column(Boolean, default=False, nullable=False)
+    # Stamped by Postgres in UTC; clock_timestamp() differs per row, so a user/bot pair inserted together stays ordered
+    timestamp = Column(DateTime, server_default=text("timezone('utc', clock_timestamp())"))
     
     __table_args__ = (
         Index('idx_chat_history_is_encrypted', 'is_encrypted'),
+        # Serves "latest N messages for a user" without a sort
+        Index('idx_chat_history_user_ts', 'user_id', 'timestamp'),
     )
\ No newline at end of file
@@ -1,13 +1,31 @@
 """Service for making astrology predictions using MCP HTTP server"""
+import asyncio
+import hashlib
 import httpx
 import logging
+import orjson
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
 from config import get_settings
+from app.services.redis_client import get_redis_client
+from app.utils.cache import TTLCache
+from app.utils.dates import date_range, today_str
+from app.utils.http import JSON_HEADERS
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Life-area predictions share one request shape: birth data plus a date range
+AREA_ENDPOINTS = {
+    "love": "/love",
+    "career": "/career",
+    "wealth": "/wealth",
+    "health": "/health",
+}
+
+def _redis_key(cache_key: tuple) -> str:
+    """Redis key for a prediction cache key, shared by every process"""
+    return "prediction:" + hashlib.sha1(orjson.dumps(cache_key)).hexdigest()
+
 class AstrologyService:
     def __init__(self):
         # Use MCP server URL instead of raw API
@@ -16,6 +34,17 @@ class AstrologyService:
         self.quick_timeout = 30.0  # For today, weekly
         self.medium_timeout = 60.0  # For monthly, quarterly
         self.long_timeout = 120.0  # For yearly, love, career, wealth, health
+        # One keep-alive connection pool for every MCP call (timeouts are set per request);
+        # over https, concurrent tool calls share one HTTP/2 connection
+        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=self.medium_timeout, http2=True)
+        # Predictions only change with the date, so repeat questions reuse the day's answer
+        self.cache = TTLCache(maxsize=settings.prediction_cache_size, ttl=settings.prediction_cache_ttl)
+        # Redis lookups waiting to go out in the next MGET (see _redis_get)
+        self._pending_gets = None
+    
+    async def close(self):
+        """Close the MCP connection pool"""
+        await self.client.aclose()
         
     def _normalize_area_prediction(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -53,22 +82,57 @@ class AstrologyService:
         """Make HTTP request to MCP server"""
         if timeout is None:
             timeout = self.medium_timeout
+        
+        cache_key = redis_key = None
+        if settings.prediction_cache_ttl > 0:
+            try:
+                # Today's date is part of the key since undated endpoints (/today, /weekly) are relative to it
+                cache_key = (endpoint, tuple(sorted(birth_data.items())), today_str())
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"MCP cache hit for {endpoint}")
+                    return cached
+                
+                # Another process (or this one before a restart) may have fetched it already
+                redis_key = _redis_key(cache_key)
+                body = await self._redis_get(redis_key)
+                if body is not None:
+                    try:
+                        result = orjson.loads(body)
+                    except orjson.JSONDecodeError:
+                        logger.warning(f"⚠️  Dropping undecodable cached prediction for {endpoint}")
+                        await self._redis_delete(redis_key)
+                    else:
+                        logger.info(f"MCP Redis cache hit for {endpoint}")
+                        self.cache.set(cache_key, result)
+                        return result
+            except Exception as e:
+                # Unhashable or unserializable birth data (e.g. model-written JSON) just skips the cache
+                logger.warning(f"⚠️  Prediction cache unavailable for {endpoint}: {e}")
+                cache_key = redis_key = None
             
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"Making MCP request to {endpoint} (timeout: {timeout}s)")
-                response = await client.post(
-                    f"{self.base_url}{endpoint}",
-                    json=birth_data
-                )
+            logger.info(f"Making MCP request to {endpoint} (timeout: {timeout}s)")
+            response = await self.client.post(
+                endpoint,
+                content=orjson.dumps(birth_data),
+                headers=JSON_HEADERS,
+                timeout=timeout
+            )
+            
+            if response.status_code == 200:
+                logger.info(f"MCP request successful for {endpoint}")
+                result = orjson.loads(response.content)
+                if cache_key is not None:
+                    self.cache.set(cache_key, result)
+                    await self._redis_set(redis_key, response.content)
+                return result
+            else:
+                # Decode the error body once for both the log and the result
+                body = response.text
+                logger.error(f"MCP request failed: {response.status_code} - {body}")
+                return {"error": f"HTTP {response.status_code}", "details": body[:200]}
                 
-                if response.status_code == 200:
-                    logger.info(f"MCP request successful for {endpoint}")
-                    return response.json()
-                else:
-                    logger.error(f"MCP request failed: {response.status_code} - {response.text}")
-                    return {"error": f"HTTP {response.status_code}", "details": response.text[:200]}
-                    
         except httpx.TimeoutException:
             logger.error(f"MCP request timed out for {endpoint} after {timeout}s")
             return {"error": "Request timed out", "timeout": timeout}
@@ -79,6 +143,63 @@ class AstrologyService:
             logger.error(f"MCP request error: {e}")
             return {"error": str(e)}
     
+    async def _redis_get(self, key: str) -> Optional[bytes]:
+        """Get a cached prediction body from Redis; lookups started together (parallel tool calls) share one MGET"""
+        loop = asyncio.get_running_loop()
+        if self._pending_gets is not None:
+            future = self._pending_gets.get(key)
+            if future is None:
+                future = self._pending_gets[key] = loop.create_future()
+            return await asyncio.shield(future)
+        
+        batch = self._pending_gets = {key: loop.create_future()}
+        results = {}
+        try:
+            # Give the other tool calls scheduled alongside this one a tick to add their keys
+            await asyncio.sleep(0)
+            self._pending_gets = None
+            keys = list(batch)
+            results = dict(zip(keys, await get_redis_client().mget(keys)))
+        except Exception as e:
+            logger.warning(f"⚠️  Prediction cache lookup failed: {e}")
+        finally:
+            # Waiters see a miss if the lookup failed or this caller was cancelled
+            if self._pending_gets is batch:
+                self._pending_gets = None
+            for pending_key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(pending_key))
+        return results.get(key)
+    
+    async def _redis_set(self, key: str, body: bytes):
+        """Store a prediction response body in Redis for prediction_cache_ttl seconds"""
+        try:
+            await get_redis_client().set(key, body, ex=settings.prediction_cache_ttl)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not cache prediction in Redis: {e}")
+    
+    async def _redis_delete(self, key: str):
+        """Remove a cached prediction from Redis"""
+        try:
+            await get_redis_client().delete(key)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not remove cached prediction from Redis: {e}")
+    
+    async def _ranged_request(self, endpoint: str, birth_data: Dict[str, Any], days: int,
+                              timeout: float) -> Dict[str, Any]:
+        """Make a request covering the next `days` days from today"""
+        start_date, end_date = date_range(days)
+        return await self._make_request(
+            endpoint,
+            {**birth_data, "start_date": start_date, "end_date": end_date},
+            timeout
+        )
+    
+    async def _area_prediction(self, area: str, birth_data: Dict[str, Any], months: int) -> Dict[str, Any]:
+        """Fetch and normalize a life-area prediction (see AREA_ENDPOINTS) for the next `months` months"""
+        result = await self._ranged_request(AREA_ENDPOINTS[area], birth_data, 30 * months, self.long_timeout)
+        return self._normalize_area_prediction(result)
+    
     async def get_birth_chart(self, birth_data: Dict[str, Any]) -> Dict[str, Any]:
         """Get complete birth chart"""
         return await self._make_request("/birth-chart", birth_data, self.quick_timeout)
@@ -97,15 +218,7 @@ class AstrologyService:
     
     async def get_quarterly_prediction(self, birth_data: Dict[str, Any]) -> Dict[str, Any]:
         """Get 3-month forecast"""
-        today = datetime.now()
-        three_months = today + timedelta(days=90)
-        
-        birth_data_with_range = {
-            **birth_data,
-            "start_date": today.strftime("%Y-%m-%d"),
-            "end_date": three_months.strftime("%Y-%m-%d")
-        }
-        return await self._make_request("/yearly", birth_data_with_range, self.long_timeout)
+        return await self._ranged_request("/yearly", birth_data, 90, self.long_timeout)
     
     async def get_yearly_prediction(self, birth_data: Dict[str, Any]) -> Dict[str, Any]:
         """Get yearly forecast"""
@@ -119,16 +232,7 @@ class AstrologyService:
             birth_data: User's birth information
             months: Number of months to predict (default 6, max 24)
         """
-        today = datetime.now()
-        end_date = today + timedelta(days=30 * months)
-        
-        birth_data_with_range = {
-            **birth_data,
-            "start_date": today.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d")
-        }
-        result = await self._make_request("/love", birth_data_with_range, self.long_timeout)
-        return self._normalize_area_prediction(result)
+        return await self._area_prediction("love", birth_data, months)
     
     async def get_career_prediction(self, birth_data: Dict[str, Any], months: int = 6) -> Dict[str, Any]:
         """
@@ -138,16 +242,7 @@ class AstrologyService:
             birth_data: User's birth information
             months: Number of months to predict (default 6, max 24)
         """
-        today = datetime.now()
-        end_date = today + timedelta(days=30 * months)
-        
-        birth_data_with_range = {
-            **birth_data,
-            "start_date": today.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d")
-        }
-        result = await self._make_request("/career", birth_data_with_range, self.long_timeout)
-        return self._normalize_area_prediction(result)
+        return await self._area_prediction("career", birth_data, months)
     
     async def get_wealth_prediction(self, birth_data: Dict[str, Any], months: int = 6) -> Dict[str, Any]:
         """
@@ -157,16 +252,7 @@ class AstrologyService:
             birth_data: User's birth information
             months: Number of months to predict (default 6, max 24)
         """
-        today = datetime.now()
-        end_date = today + timedelta(days=30 * months)
-        
-        birth_data_with_range = {
-            **birth_data,
-            "start_date": today.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d")
-        }
-        result = await self._make_request("/wealth", birth_data_with_range, self.long_timeout)
-        return self._normalize_area_prediction(result)
+        return await self._area_prediction("wealth", birth_data, months)
     
     async def get_health_prediction(self, birth_data: Dict[str, Any], months: int = 6) -> Dict[str, Any]:
         """
@@ -176,16 +262,7 @@ class AstrologyService:
             birth_data: User's birth information
             months: Number of months to predict (default 6, max 24)
         """
-        today = datetime.now()
-        end_date = today + timedelta(days=30 * months)
-        
-        birth_data_with_range = {
-            **birth_data,
-            "start_date": today.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d")
-        }
-        result = await self._make_request("/health", birth_data_with_range, self.long_timeout)
-        return self._normalize_area_prediction(result)
+        return await self._area_prediction("health", birth_data, months)
     
     async def get_wildcard_prediction(self, birth_data: Dict[str, Any], query: str, 
                                      specific_date: Optional[str] = None) -> Dict[str, Any]:
@@ -218,10 +295,9 @@ class AstrologyService:
     async def health_check(self) -> Dict[str, Any]:
         """Check if MCP server is healthy"""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health")
-                if response.status_code == 200:
-                    return response.json()
-                return {"mcp_server": "unhealthy", "status_code": response.status_code}
+            response = await self.client.get("/health", timeout=5.0)
+            if response.status_code == 200:
+                return orjson.loads(response.content)
+            return {"mcp_server": "unhealthy", "status_code": response.status_code}
         except Exception as e:
             return {"mcp_server": "unreachable", "error": str(e)}
\ No newline at end of file
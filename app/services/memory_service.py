@@ -1,8 +1,15 @@
 """Memory service for storing and retrieving user context using Mem0"""
 import httpx
 import logging
+import orjson
 import asyncio
+from collections import deque
 from config import get_settings
+from app.utils.batch_writer import BatchWriter
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.http import JSON_HEADERS
+from app.utils.single_flight import SingleFlight
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -10,55 +17,153 @@ logger = logging.getLogger(__name__)
 class MemoryService:
     def __init__(self):
         self.base_url = settings.mem0_service_url
-        
+        # One keep-alive connection pool for every Mem0 call (HTTP/2 when served over https)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=30.0,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60),
+            headers={"Accept": "application/json"}
+        )
+        # Pending /get lookups, so concurrent identical ones share a single request
+        self._inflight = SingleFlight()
+        # Recent /get results; a user's generation is bumped on /clear so none outlive it
+        self.cache = TTLCache(maxsize=10000, ttl=settings.mem0_cache_ttl)
+        self._generations = {}
+        # Skip Mem0 for a while after repeated failures instead of waiting out each timeout
+        self._breaker = CircuitBreaker(fail_threshold=5, reset_timeout=30.0)
+        self._pending_adds = deque(maxlen=1000)
+        # Background /add writes, so replies never wait on Mem0; four writers each take whatever
+        # is already waiting (up to mem0_batch_max)
+        self._writes = BatchWriter("memory", self._send_adds, workers=4, batch_size=settings.mem0_batch_max)
+    
+    async def close(self):
+        """Send queued memory writes, then close the Mem0 connection pool"""
+        await self._writes.close()
+        await self.client.aclose()
+    
+    def enqueue_add(self, user_id: int, user_message: str, ai_message: str):
+        """Queue a conversation to be added to memory in the background"""
+        if not self._writes.put((user_id, user_message, ai_message)):
+            logger.warning("⚠️ Memory write queue full, skipping memory for user %s", user_id)
+    
+    async def _send_adds(self, batch: list):
+        """Send a batch of queued memory writes"""
+        # Mem0 only accepts single writes, so a batch goes out as concurrent POSTs on the pooled client
+        results = await asyncio.gather(
+            *(self.add_memory(*item) for item in batch),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Failed to add memory: %s", result)
+    
+    def _record_response(self, response: httpx.Response):
+        """Feed a Mem0 response to the circuit breaker (5xx counts as a failure)"""
+        if response.status_code >= 500:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+    
     async def add_memory(self, user_id: int, user_message: str, ai_message: str):
         """Add a conversation to memory"""
+        if not self._breaker.allow():
+            # Held and replayed once Mem0 answers again, rather than dropped
+            self._pending_adds.append((user_id, user_message, ai_message))
+            logger.warning("⚡ Mem0 circuit open, holding memory for user %s", user_id)
+            return None
+        
+        result = await self._post_add(user_id, user_message, ai_message)
+        if result is not None and self._pending_adds:
+            await self._replay_pending_adds()
+        return result
+    
+    async def _post_add(self, user_id: int, user_message: str, ai_message: str, replaying: bool = False):
+        """POST one exchange to /add; held for replay if Mem0 can't be reached"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/add",
-                    json={
-                        "user_id": user_id,
-                        "user_message": user_message,
-                        "ai_message": ai_message
-                    }
-                )
-                
-                if response.status_code == 200:
-                    logger.info(f"✅ Added memory for user {user_id}")
-                    return response.json()
-                else:
-                    logger.warning(f"⚠️ Failed to add memory: {response.status_code}")
-                    return None
-                    
+            response = await self.client.post(
+                "/add",
+                content=orjson.dumps({
+                    "user_id": user_id,
+                    "user_message": user_message,
+                    "ai_message": ai_message
+                }),
+                headers=JSON_HEADERS
+            )
+            self._record_response(response)
+            
+            if response.status_code == 200:
+                logger.info("✅ Added memory for user %s", user_id)
+                return orjson.loads(response.content)
+            else:
+                logger.warning("⚠️ Failed to add memory: %s", response.status_code)
+                return None
+        
+        except httpx.HTTPError as e:
+            self._breaker.record_failure()
+            # A replayed exchange goes back to the front, so held memories keep their order
+            if replaying:
+                self._pending_adds.appendleft((user_id, user_message, ai_message))
+            else:
+                self._pending_adds.append((user_id, user_message, ai_message))
+            logger.error("Error adding memory: %s", e)
+            return None
         except Exception as e:
-            logger.error(f"Error adding memory: {e}")
+            logger.error("Error adding memory: %s", e)
             return None
     
+    async def _replay_pending_adds(self):
+        """Send memories held while the circuit was open, stopping at the first failure"""
+        logger.info("🔁 Replaying %s held memories", len(self._pending_adds))
+        while self._pending_adds and self._breaker.allow():
+            if await self._post_add(*self._pending_adds.popleft(), replaying=True) is None:
+                break
+    
     async def get_memories(self, user_id: int, msg: str, num_chats: int = 5):
         """Get relevant memories for a user"""
+        key = (user_id, msg, num_chats, self._generations.get(user_id, 0))
+        if settings.mem0_cache_ttl > 0:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        if key in self._inflight:
+            logger.info("🧠 Joining in-flight memory lookup for user %s", user_id)
+        return await self._inflight.run(key, lambda: self._fetch_memories(user_id, msg, num_chats, key))
+    
+    async def _fetch_memories(self, user_id: int, msg: str, num_chats: int, cache_key: tuple):
+        """Query Mem0 /get for memories relevant to msg, caching successful results under cache_key"""
+        if not self._breaker.allow():
+            return {"data": ""}
+        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/get",
-                    params={
-                        "user_id": user_id,
-                        "msg": msg,
-                        "num_chats": num_chats,
-                        "include_chat_history": "false"
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.info(f"✅ Retrieved memories for user {user_id}")
-                    return result
-                else:
-                    logger.warning(f"⚠️ Failed to get memories: {response.status_code}")
-                    return {"data": ""}
-                    
+            response = await self.client.get(
+                "/get",
+                params={
+                    "user_id": user_id,
+                    "msg": msg,
+                    "num_chats": num_chats,
+                    "include_chat_history": "false"
+                }
+            )
+            self._record_response(response)
+            
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                if settings.mem0_cache_ttl > 0:
+                    self.cache.set(cache_key, result)
+                logger.info("✅ Retrieved memories for user %s", user_id)
+                return result
+            else:
+                logger.warning("⚠️ Failed to get memories: %s", response.status_code)
+                return {"data": ""}
+        
+        except httpx.HTTPError as e:
+            self._breaker.record_failure()
+            logger.error("Error getting memories: %s", e)
+            return {"data": ""}
         except Exception as e:
-            logger.error(f"Error getting memories: {e}")
+            logger.error("Error getting memories: %s", e)
             return {"data": ""}
     
     async def clear_memory(self, user_id: int, max_retries: int = 3):
@@ -66,70 +171,75 @@ class MemoryService:
         Clear all memories for a user using DELETE /clear endpoint
         Retries multiple times to ensure all memories are cleared
         """
+        # Drop cached lookups and held writes for this user, whatever the outcome
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        self._pending_adds = deque(
+            (pending for pending in self._pending_adds if pending[0] != user_id),
+            maxlen=self._pending_adds.maxlen
+        )
+        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                for attempt in range(max_retries):
-                    # Call delete
-                    response = await client.delete(
-                        f"{self.base_url}/clear",
+            for attempt in range(max_retries):
+                # Call delete
+                response = await self.client.delete(
+                    "/clear",
+                    params={"user_id": str(user_id)}
+                )
+                
+                if response.status_code == 200:
+                    result = orjson.loads(response.content)
+                    logger.info("✅ Clear request successful for user %s (attempt %s): %s", user_id, attempt + 1, result.get('message', ''))
+                    
+                    # Wait a moment for processing
+                    await asyncio.sleep(0.5)
+                    
+                    # Verify memories are cleared
+                    verify_response = await self.client.get(
+                        "/get_all",
                         params={"user_id": str(user_id)}
                     )
                     
-                    if response.status_code == 200:
-                        result = response.json()
-                        logger.info(f"✅ Clear request successful for user {user_id} (attempt {attempt + 1}): {result.get('message', '')}")
-                        
-                        # Wait a moment for processing
-                        await asyncio.sleep(0.5)
+                    if verify_response.status_code == 200:
+                        verify_result = orjson.loads(verify_response.content)
+                        remaining = verify_result.get('count', 0)
                         
-                        # Verify memories are cleared
-                        verify_response = await client.get(
-                            f"{self.base_url}/get_all",
-                            params={"user_id": str(user_id)}
-                        )
-                        
-                        if verify_response.status_code == 200:
-                            verify_result = verify_response.json()
-                            remaining = verify_result.get('count', 0)
-                            
-                            if remaining == 0:
-                                logger.info(f"✅ Verified: All memories cleared for user {user_id}")
-                                return True
-                            else:
-                                logger.warning(f"⚠️ {remaining} memories still remaining for user {user_id}, retrying...")
-                                await asyncio.sleep(1)  # Wait before retry
+                        if remaining == 0:
+                            logger.info("✅ Verified: All memories cleared for user %s", user_id)
+                            return True
                         else:
-                            logger.warning(f"⚠️ Could not verify clear status")
+                            logger.warning("⚠️ %s memories still remaining for user %s, retrying...", remaining, user_id)
+                            await asyncio.sleep(1)  # Wait before retry
                     else:
-                        logger.warning(f"⚠️ Failed to clear memories (attempt {attempt + 1}): {response.status_code} - {response.text}")
-                        await asyncio.sleep(1)
+                        logger.warning("⚠️ Could not verify clear status")
+                else:
+                    logger.warning("⚠️ Failed to clear memories (attempt %s): %s - %s", attempt + 1, response.status_code, response.text)
+                    await asyncio.sleep(1)
+            
+            # After all retries, return True if we got success responses
+            logger.warning("⚠️ Clear completed but some memories may remain for user %s", user_id)
+            return True
                 
-                # After all retries, return True if we got success responses
-                logger.warning(f"⚠️ Clear completed but some memories may remain for user {user_id}")
-                return True
-                    
         except Exception as e:
-            logger.error(f"Error clearing memory: {e}")
+            logger.error("Error clearing memory: %s", e)
             return False
     
     async def get_all_memories(self, user_id: int):
         """Get all memories for a user (for debugging/verification)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/get_all",
-                    params={"user_id": str(user_id)}
-                )
+            response = await self.client.get(
+                "/get_all",
+                params={"user_id": str(user_id)}
+            )
+            
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                count = result.get('count', 0)
+                logger.info("✅ Retrieved all memories for user %s: %s memories", user_id, count)
+                return result
+            else:
+                logger.warning("⚠️ Failed to get all memories: %s", response.status_code)
+                return {"status": "error", "count": 0, "memories": []}
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    count = result.get('count', 0)
-                    logger.info(f"✅ Retrieved all memories for user {user_id}: {count} memories")
-                    return result
-                else:
-                    logger.warning(f"⚠️ Failed to get all memories: {response.status_code}")
-                    return {"status": "error", "count": 0, "memories": []}
-                    
         except Exception as e:
-            logger.error(f"Error getting all memories: {e}")
+            logger.error("Error getting all memories: %s", e)
             return {"status": "error", "count": 0, "memories": []}
\ No newline at end of file
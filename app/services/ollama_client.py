@@ -0,0 +1,53 @@
+"""Shared Ollama client so all agents reuse one keep-alive connection pool"""
+import logging
+import time
+import httpx
+from ollama import AsyncClient
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Global instance
+_client = None
+
+def get_ollama_client() -> AsyncClient:
+    """Get or create the shared Ollama client"""
+    global _client
+    if _client is None:
+        _client = AsyncClient(
+            host=settings.ollama_host,
+            # Fail fast when Ollama is unreachable; generation itself may legitimately take minutes
+            timeout=httpx.Timeout(None, connect=10.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=16,
+                max_connections=64,
+                keepalive_expiry=300.0
+            )
+        )
+    return _client
+
+async def warm_ollama_model():
+    """Load the chat model into Ollama's memory so the first user request doesn't pay for it"""
+    try:
+        start = time.monotonic()
+        # An empty prompt makes Ollama load the model without generating anything
+        await get_ollama_client().generate(model=settings.ollama_model, prompt='')
+        logger.info(f"🦙 Model {settings.ollama_model} loaded in {time.monotonic() - start:.1f}s")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not preload Ollama model {settings.ollama_model}: {e}")
+
+async def close_ollama_client():
+    """Close the shared Ollama client's connection pool"""
+    global _client
+    if _client is None:
+        return
+    
+    try:
+        # ollama.AsyncClient wraps an httpx.AsyncClient without exposing a close method
+        await _client._client.aclose()
+        logger.info("🦙 Closed Ollama client")
+    except Exception as e:
+        logger.error(f"Error closing Ollama client: {e}")
+    finally:
+        _client = None
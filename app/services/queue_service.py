@@ -1,20 +1,33 @@
 """RabbitMQ Queue Service with priority support"""
 import logging
-import json
 import asyncio
+import time
+import orjson
 from aio_pika import connect_robust, Message, DeliveryMode
-from aio_pika.abc import AbstractConnection, AbstractChannel, AbstractQueue
+from aio_pika.abc import AbstractConnection, AbstractChannel, AbstractExchange, AbstractIncomingMessage, AbstractQueue
 from config import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# How long shutdown waits for in-flight requests before cancelling (and requeueing) them
+SHUTDOWN_GRACE_SECONDS = 30
+
+# Queue size is re-read from the broker at most this often, however many callers ask
+QUEUE_SIZE_TTL = 1.0
+
 class QueueService:
     def __init__(self):
         self.connection: AbstractConnection = None
         self.channel: AbstractChannel = None
         self.queue: AbstractQueue = None
+        self.publish_channel: AbstractChannel = None
+        self.exchange: AbstractExchange = None
         self.is_processing = False
+        self._inflight: set = set()
+        self._size = 0
+        self._size_checked_at = 0.0
+        self._size_lock = asyncio.Lock()
     
     async def connect(self):
         """Connect to RabbitMQ"""
@@ -23,8 +36,9 @@ class QueueService:
             self.connection = await connect_robust(settings.rabbitmq_url)
             self.channel = await self.connection.channel()
             
-            # Set prefetch count based on number of workers
-            await self.channel.set_qos(prefetch_count=settings.rabbitmq_workers)
+            # Messages buffered unacked; defaults to the worker count so priority ordering still
+            # applies to everything not yet being processed
+            await self.channel.set_qos(prefetch_count=settings.rabbitmq_prefetch or settings.rabbitmq_workers)
             
             # Declare queue with priority support (max priority 10)
             self.queue = await self.channel.declare_queue(
@@ -35,6 +49,11 @@ class QueueService:
                 }
             )
             
+            # Publishing gets its own confirm-mode channel so consumer prefetch/acks never hold it up;
+            # each publish awaits only its own confirm, so concurrent publishes are pipelined
+            self.publish_channel = await self.connection.channel(publisher_confirms=True)
+            self.exchange = self.publish_channel.default_exchange
+            
             logger.info(f"✅ Connected to RabbitMQ - Queue: {settings.rabbitmq_queue} (priority enabled)")
             
         except Exception as e:
@@ -53,7 +72,7 @@ class QueueService:
     async def publish_request(self, request_data: dict) -> str:
         """Publish a request to the queue with priority"""
         try:
-            message_body = json.dumps(request_data).encode()
+            message_body = orjson.dumps(request_data)
             
             # Get priority from request (default 5)
             priority = request_data.get('priority', 5)
@@ -69,9 +88,10 @@ class QueueService:
                 priority=rabbitmq_priority  # Set message priority
             )
             
-            await self.channel.default_exchange.publish(
+            await self.exchange.publish(
                 message,
-                routing_key=settings.rabbitmq_queue
+                routing_key=settings.rabbitmq_queue,
+                timeout=5
             )
             
             request_id = request_data.get('request_id', 'unknown')
@@ -84,40 +104,77 @@ class QueueService:
             raise
     
     async def start_consumer(self, handler):
-        """Start consuming messages from the queue"""
+        """Consume messages, running up to rabbitmq_workers handlers concurrently"""
+        semaphore = asyncio.Semaphore(settings.rabbitmq_workers)
         try:
-            logger.info(f"🐰 Starting consumer for queue: {settings.rabbitmq_queue}")
+            logger.info(f"🐰 Starting consumer for queue: {settings.rabbitmq_queue} ({settings.rabbitmq_workers} worker(s))")
             self.is_processing = True
             
             async with self.queue.iterator() as queue_iter:
                 async for message in queue_iter:
-                    async with message.process():
-                        try:
-                            request_data = json.loads(message.body.decode())
-                            request_id = request_data.get('request_id', 'unknown')
-                            priority = request_data.get('priority', 5)
-                            
-                            logger.info(f"📥 Processing request {request_id} (priority: {priority}) from queue")
-                            
-                            # Call the handler to process the request
-                            await handler(request_data)
-                            
-                            logger.info(f"✅ Completed request {request_id}")
-                            
-                        except Exception as e:
-                            logger.error(f"❌ Error processing message: {e}", exc_info=True)
-                            
+                    # Wait for a free worker before taking on another message
+                    await semaphore.acquire()
+                    task = asyncio.create_task(self._process_one(message, handler, semaphore))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+            
         except asyncio.CancelledError:
             logger.info("🛑 Consumer stopped")
             self.is_processing = False
+            await self._drain_inflight()
         except Exception as e:
             logger.error(f"❌ Consumer error: {e}", exc_info=True)
             self.is_processing = False
     
-    async def get_queue_size(self) -> int:
-        """Get approximate queue size"""
+    async def _process_one(self, message: AbstractIncomingMessage, handler, semaphore: asyncio.Semaphore):
+        """Run the handler for one message, acking it afterwards (requeued if cancelled)"""
         try:
-            return 0
-        except Exception as e:
-            logger.error(f"Error getting queue size: {e}")
-            return 0
\ No newline at end of file
+            async with message.process(requeue=True):
+                try:
+                    request_data = orjson.loads(message.body)
+                    request_id = request_data.get('request_id', 'unknown')
+                    priority = request_data.get('priority', 5)
+                    
+                    logger.info(f"📥 Processing request {request_id} (priority: {priority}) from queue")
+                    
+                    # Call the handler to process the request
+                    await handler(request_data)
+                    
+                    logger.info(f"✅ Completed request {request_id}")
+                    
+                except Exception as e:
+                    logger.error(f"❌ Error processing message: {e}", exc_info=True)
+        finally:
+            semaphore.release()
+    
+    async def _drain_inflight(self):
+        """Let in-flight requests finish, cancelling any still running after the grace period"""
+        if not self._inflight:
+            return
+        
+        logger.info(f"⏳ Waiting for {len(self._inflight)} in-flight request(s)...")
+        _, pending = await asyncio.wait(set(self._inflight), timeout=SHUTDOWN_GRACE_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"⚠️  Requeued {len(pending)} unfinished request(s)")
+    
+    async def get_queue_size(self) -> int:
+        """Get approximate number of requests waiting (cached for QUEUE_SIZE_TTL seconds)"""
+        if time.monotonic() - self._size_checked_at < QUEUE_SIZE_TTL or self.queue is None:
+            return self._size
+        
+        async with self._size_lock:
+            # Another caller may have refreshed it while we waited
+            if time.monotonic() - self._size_checked_at < QUEUE_SIZE_TTL:
+                return self._size
+            try:
+                # Re-declaring with the same arguments is a no-op that reports the ready count
+                declare_ok = await self.queue.declare(timeout=5)
+                self._size = declare_ok.message_count
+            except Exception as e:
+                logger.error(f"Error getting queue size: {e}")
+            self._size_checked_at = time.monotonic()
+        
+        return self._size
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Shared Redis client so every service reuses one connection pool"""
+import logging
+import redis.asyncio as aioredis
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Global instance
+_client = None
+
+def get_redis_client() -> aioredis.Redis:
+    """Get or create the shared Redis client (replies are raw bytes; decode only what is read back)"""
+    global _client
+    if _client is None:
+        _client = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                password=settings.redis_password if settings.redis_password else None,
+                max_connections=50
+            )
+        )
+    return _client
+
+async def close_redis_client():
+    """Close the shared Redis client's connection pool"""
+    global _client
+    if _client is None:
+        return
+    
+    try:
+        await _client.aclose()
+        await _client.connection_pool.disconnect()
+        logger.info("🔴 Closed Redis client")
+    except Exception as e:
+        logger.error(f"Error closing Redis client: {e}")
+    finally:
+        _client = None
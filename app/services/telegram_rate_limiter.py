@@ -0,0 +1,52 @@
+"""Token bucket pacing outbound Telegram messages under the bot-wide rate limit"""
+import asyncio
+import time
+
+# Telegram allows a bot roughly 30 messages per second across all chats
+MESSAGES_PER_SECOND = 30.0
+BURST = 30
+
+class TokenBucket:
+    """Async token bucket; waiters are served in arrival order, so each chat's messages stay in order"""
+
+    def __init__(self, rate: float = MESSAGES_PER_SECOND, capacity: int = BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a send is allowed, then take a token"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def penalize(self, retry_after: float):
+        """Hold every sender for retry_after seconds, as Telegram asks after a 429"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        # Start empty when the block lifts rather than with tokens saved up during it
+        self._tokens = 0.0
+        self._updated_at = self._blocked_until
+
+# Shared by every sender in the process
+_bucket = None
+
+def get_send_bucket() -> TokenBucket:
+    """Get the process-wide outbound message bucket"""
+    global _bucket
+    if _bucket is None:
+        _bucket = TokenBucket()
+    return _bucket
@@ -1,68 +1,163 @@
-from telegram import Bot, Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
-from telegram.ext import Application, MessageHandler, filters, ContextTypes, CommandHandler, ConversationHandler
+from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
+from telegram.ext import Application, ExtBot, MessageHandler, filters, ContextTypes, CommandHandler, ConversationHandler
 from config import get_settings
 import logging
 import asyncio
-import redis
+import httpx
+import orjson
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
 from app.models import ChatHistory
+from app.services.redis_client import get_redis_client
+from app.services.telegram_rate_limiter import get_send_bucket
+from app.utils.batch_writer import BatchWriter
 from datetime import datetime
+from typing import List, Tuple
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Telegram message length limit
+# Telegram message length limit, counted in UTF-16 code units
 TELEGRAM_MAX_LENGTH = 4096
+TRUNCATION_SUFFIX = "\n\n✨ (Message truncated)"
+TRUNCATION_BUDGET = TELEGRAM_MAX_LENGTH - len(TRUNCATION_SUFFIX.encode('utf-16-le')) // 2
+
+# Telegram Bot API base for pre-encoded requests (see send_raw)
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+def encode_static_message(text: str) -> bytes:
+    """Pre-encode a sendMessage body for a fixed text; fill in the chat with `body % chat_id`"""
+    # Escape % so only the chat_id placeholder is substituted
+    return b'{"chat_id":%d,"text":' + orjson.dumps(text).replace(b'%', b'%%') + b'}'
+
+def _fit_message(text: str) -> str:
+    """Truncate text to Telegram's length limit, returning it unchanged when it already fits"""
+    # A code point is at most two UTF-16 units, so short texts never need encoding
+    if len(text) * 2 <= TELEGRAM_MAX_LENGTH:
+        return text
+    
+    encoded = text.encode('utf-16-le')
+    if len(encoded) <= TELEGRAM_MAX_LENGTH * 2:
+        return text
+    
+    logger.warning("Message too long (%s UTF-16 units), truncating...", len(encoded) // 2)
+    # errors='ignore' drops a surrogate pair split by the cut
+    return encoded[:TRUNCATION_BUDGET * 2].decode('utf-16-le', errors='ignore') + TRUNCATION_SUFFIX
+
+# Telegram shows "typing" for 5s per sendChatAction; skip it entirely for replies faster than the delay
+TYPING_START_DELAY = 1.0
+TYPING_INTERVAL = 4.5
+
+# Chat history writes arriving within this window (seconds) share one INSERT and commit
+CHAT_BATCH_WINDOW = 0.05
+CHAT_BATCH_SIZE = 64
 
 # Conversation states
 BIRTH_DATE, BIRTH_TIME, BIRTH_PLACE = range(3)
 
 class TelegramService:
     def __init__(self):
-        self.bot = Bot(token=settings.telegram_bot_token)
+        # Workers send replies and typing actions concurrently; PTB's default pool is 1 connection.
+        # The Application reuses this bot, so handler replies share the same keep-alive pool
+        self.bot = ExtBot(
+            token=settings.telegram_bot_token,
+            request=HTTPXRequest(
+                connection_pool_size=64,
+                http_version="2",
+                read_timeout=20,
+                write_timeout=20,
+                connect_timeout=10,
+                pool_timeout=5
+            )
+        )
         self.application = None
-        self.redis_client = redis.Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            db=settings.redis_db,
-            password=settings.redis_password if settings.redis_password else None,
-            decode_responses=True
+        # Chat history writes, saved in the background by _save_chat_batch
+        self._chat_writes = BatchWriter("chat", self._save_chat_batch, batch_size=CHAT_BATCH_SIZE, window=CHAT_BATCH_WINDOW)
+        # Used by send_raw for replies whose request body is encoded ahead of time
+        self.api_client = httpx.AsyncClient(
+            base_url=f"{TELEGRAM_API_URL}/bot{settings.telegram_bot_token}/",
+            timeout=10.0
         )
     
+    @property
+    def redis_client(self):
+        """The shared Redis client (looked up each time, so a recreated client is picked up)"""
+        return get_redis_client()
+    
+    async def close(self):
+        """Save queued chats, then close the send_raw connection pool (the Bot is shut down by its Application)"""
+        await self._chat_writes.close()
+        await self.api_client.aclose()
+    
     async def send_typing(self, chat_id: int):
         """Send typing indicator to show bot is processing"""
         try: 
             await self.bot.send_chat_action(chat_id=chat_id, action="typing")
         except Exception as e:
-            logger.error(f"Error sending typing action: {e}")
+            logger.error("Error sending typing action: %s", e)
     
     async def keep_typing(self, chat_id: int, stop_event: asyncio.Event):
         """Keep sending typing indicator until stop_event is set"""
+        # One waiter for the whole reply; asyncio.wait times out without raising
+        stopped = asyncio.ensure_future(stop_event.wait())
         try:
-            while not stop_event.is_set():
+            await asyncio.wait((stopped,), timeout=TYPING_START_DELAY)
+            while not stopped.done():
                 await self.send_typing(chat_id)
-                try:
-                    await asyncio.wait_for(stop_event.wait(), timeout=4.0)
-                except asyncio.TimeoutError:
-                    continue
+                await asyncio.wait((stopped,), timeout=TYPING_INTERVAL)
         except Exception as e:
-            logger.error(f"Error in keep_typing: {e}")
+            logger.error("Error in keep_typing: %s", e)
+        finally:
+            stopped.cancel()
+    
+    async def _send_paced(self, chat_id: int, text: str, reply_markup=None):
+        """Send within the outbound rate limit, retrying once if Telegram says to back off"""
+        bucket = get_send_bucket()
+        for attempt in range(2):
+            await bucket.acquire()
+            try:
+                return await self.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+            except RetryAfter as e:
+                logger.warning("⏳ Telegram rate limit hit, pausing sends for %ss", e.retry_after)
+                bucket.penalize(e.retry_after)
+                if attempt:
+                    raise
+    
+    async def send_raw(self, chat_id: int, body_template: bytes):
+        """Send a static message pre-encoded with encode_static_message, within the outbound rate limit"""
+        bucket = get_send_bucket()
+        for attempt in range(2):
+            await bucket.acquire()
+            response = await self.api_client.post(
+                "sendMessage",
+                content=body_template % chat_id,
+                headers={"Content-Type": "application/json"}
+            )
+            if response.status_code != 429:
+                break
+            
+            retry_after = orjson.loads(response.content).get('parameters', {}).get('retry_after', 1)
+            logger.warning("⏳ Telegram rate limit hit, pausing sends for %ss", retry_after)
+            bucket.penalize(retry_after)
+        
+        if response.status_code != 200:
+            logger.error("Error sending static message: %s - %s", response.status_code, response.text[:200])
     
     async def send_message(self, chat_id: int, text: str, reply_markup=None):
         """Send text message to user with length validation"""
         try:
-            if len(text) > TELEGRAM_MAX_LENGTH:
-                logger.warning(f"Message too long ({len(text)} chars), truncating...")
-                text = text[:TELEGRAM_MAX_LENGTH-50] + "\n\n✨ (Message truncated)"
-            
-            await self.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
-            logger.info(f"📤 Telegram sent: chat {chat_id} - {len(text)} chars")
+            text = _fit_message(text)
+            await self._send_paced(chat_id, text, reply_markup)
+            logger.info("📤 Telegram sent: chat %s - %s chars", chat_id, len(text))
         except Exception as e:
-            logger.error(f"Error sending message: {e}")
+            logger.error("Error sending message: %s", e)
             try:
-                await self.bot.send_message(
-                    chat_id=chat_id,
-                    text="Sorry, I generated too much info! 🌙 Could you ask about something more specific? 🌿"
+                await self._send_paced(
+                    chat_id,
+                    "Sorry, I generated too much info! 🌙 Could you ask about something more specific? 🌿"
                 )
             except:
                 pass
@@ -70,7 +165,7 @@ class TelegramService:
     
     def setup_application(self, message_handler, conversation_handler, clear_handler, start_handler=None, help_handler=None, info_handler=None):
         """Setup telegram application with message and command handlers"""
-        self.application = Application.builder().token(settings.telegram_bot_token).build()
+        self.application = Application.builder().bot(self.bot).build()
         
         # Add command handlers
         if start_handler:
@@ -94,94 +189,71 @@ class TelegramService:
         
         return self.application
     
-    async def save_chat_to_db(self, db, user_id: int, message_type: str, message: str):
-        """Save chat message to database with encryption support"""
-        try:
-            from app.models import User, ChatHistory
-            from app.utils.encryption import get_encryption
-            from sqlalchemy import select
-            
-            # Check if user wants encryption
-            stmt = select(User).where(User.id == user_id)
-            result = await db.execute(stmt)
-            user = result.scalar_one_or_none()
-            
-            should_encrypt = user and user.encrypt_chats
-            
-            # Encrypt message if needed
-            if should_encrypt:
-                encryption = get_encryption()
-                encrypted_message = encryption.encrypt(message)
-                is_encrypted = True
-                stored_message = encrypted_message
-            else:
-                is_encrypted = False
-                stored_message = message
-            
-            # Save to database
-            chat = ChatHistory(
-                user_id=user_id,
-                message_type=message_type,
-                message=stored_message,
-                is_encrypted=is_encrypted
-            )
-            db.add(chat)
+    async def _chat_rows(self, user_id: int, messages: List[Tuple[str, str]]) -> List[dict]:
+        """Build chat_history rows for a user's messages, encrypted if they opted in"""
+        from app.services.user_cache import get_user
+        from app.utils.encryption import get_encryption
+        
+        # Check if user wants encryption
+        user = await get_user(user_id)
+        
+        should_encrypt = bool(user and user.encrypt_chats)
+        encryption = get_encryption() if should_encrypt else None
+        
+        return [
+            {
+                'user_id': user_id,
+                'message_type': message_type,
+                'message': encryption.encrypt(message) if should_encrypt else message,
+                'is_encrypted': should_encrypt
+            }
+            for message_type, message in messages
+        ]
+    
+    def enqueue_chats(self, user_id: int, messages: List[Tuple[str, str]]):
+        """Queue (message_type, message) pairs to be saved to the database in the background"""
+        if not self._chat_writes.put((user_id, messages)):
+            logger.warning("⚠️ Chat write queue full, not saving chat for user %s", user_id)
+    
+    async def _save_chat_batch(self, batch: List[Tuple[int, List[Tuple[str, str]]]]):
+        """Save queued chats: whatever arrived within CHAT_BATCH_WINDOW, up to CHAT_BATCH_SIZE requests"""
+        rows = []
+        for user_id, messages in batch:
+            rows.extend(await self._chat_rows(user_id, messages))
+        
+        # One multi-row INSERT and one commit for the whole batch
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(ChatHistory), rows)
             await db.commit()
-            
-            # Conditional logging
-            if not should_encrypt:
-                logger.info(f"Saved {message_type} message for user {user_id}")
-            else:
-                logger.info(f"Saved encrypted {message_type} message for user {user_id}")
-            
-        except Exception as e:
-            logger.error(f"Error saving chat to DB: {e}")
-            await db.rollback()
-
+        logger.info("Saved %s chat messages for %s request(s)", len(rows), len(batch))
     
-    def save_chat_to_redis(self, user_id: int, message_type: str, message: str):
-        """Save chat to Redis with sliding window limit"""
+    async def save_turn_to_redis(self, user_id: int, user_message: str, bot_message: str):
+        """Append a user/bot exchange to the user's Redis history, keeping the last redis_chat_history_limit turns"""
         try:
             key = f"chat_history:{user_id}"
-            history = self.redis_client.lrange(key, 0, -1)
-            
-            pairs = []
-            for i in range(0, len(history), 2):
-                if i + 1 < len(history):
-                    pairs.append((history[i], history[i+1]))
-            
-            if message_type == "user":
-                pairs.append((message, ""))
-            elif message_type == "bot" and pairs:
-                last_pair = list(pairs[-1])
-                last_pair[1] = message
-                pairs[-1] = tuple(last_pair)
-            
-            pairs = pairs[-settings.redis_chat_history_limit:]
+            # One JSON entry per turn, so the window is a plain LTRIM with no pairing to rebuild
+            turn = orjson.dumps({"u": user_message, "b": bot_message})
+            async with self.redis_client.pipeline() as pipe:
+                pipe.rpush(key, turn)
+                pipe.ltrim(key, -settings.redis_chat_history_limit, -1)
+                await pipe.execute()
             
-            self.redis_client.delete(key)
-            for user_msg, bot_msg in pairs:
-                self.redis_client.rpush(key, user_msg)
-                if bot_msg:
-                    self.redis_client.rpush(key, bot_msg)
-                    
         except Exception as e:
-            logger.error(f"Error saving chat to Redis: {e}")
+            logger.error("Error saving chat to Redis: %s", e)
     
-    def clear_redis_history(self, user_id: int):
+    async def clear_redis_history(self, user_id: int):
         """Clear user's chat history from Redis"""
         try:
             key = f"chat_history:{user_id}"
-            self.redis_client.delete(key)
-            logger.info(f"🗑️ Cleared Redis history for user {user_id}")
+            await self.redis_client.delete(key)
+            logger.info("🗑️ Cleared Redis history for user %s", user_id)
         except Exception as e:
-            logger.error(f"Error clearing Redis history for user {user_id}: {e}")
+            logger.error("Error clearing Redis history for user %s: %s", user_id, e)
 
     async def clear_user_history(self, db: AsyncSession, user_id: int):
         """Clear user's chat history from DB and Redis"""
         try:
             from sqlalchemy import delete
-            from app.models import ChatHistory
             
             # Delete from database
             stmt = delete(ChatHistory).where(ChatHistory.user_id == user_id)
@@ -189,17 +261,16 @@ class TelegramService:
             await db.commit()
             
             # Clear from Redis
-            self.clear_redis_history(user_id)
+            await self.clear_redis_history(user_id)
             
-            logger.info(f"🗑️ Cleared chat history for user {user_id}")
+            logger.info("🗑️ Cleared chat history for user %s", user_id)
         except Exception as e:
-            logger.error(f"Error clearing history for user {user_id}: {e}")
+            logger.error("Error clearing history for user %s: %s", user_id, e)
             await db.rollback()
     
     async def get_chat_history(self, db, user_id: int, limit: int = 5) -> list:
         """Get chat history from database with decryption support"""
         try:
-            from app.models import ChatHistory
             from app.utils.encryption import get_encryption
             from sqlalchemy import select
             
@@ -229,5 +300,5 @@ class TelegramService:
             return decrypted_chats
             
         except Exception as e:
-            logger.error(f"Error getting chat history: {e}")
+            logger.error("Error getting chat history: %s", e)
             return []
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Short-lived cache of the user fields read on every message and command"""
+import logging
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models import User
+from app.utils.cache import TTLCache
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+class CachedUser(NamedTuple):
+    first_name: Optional[str]
+    date_of_birth: Optional[str]
+    time_of_birth: Optional[str]
+    place_of_birth: Optional[str]
+    encrypt_chats: bool
+    is_active: bool
+    priority: int
+    strikes: int
+
+# Only these columns are loaded (not the JSON horoscope blobs)
+_COLUMNS = tuple(getattr(User, field) for field in CachedUser._fields)
+
+_cache = TTLCache(maxsize=10000, ttl=settings.user_cache_ttl)
+
+# Bumped on every invalidation so a load that raced with a write isn't cached
+_invalidations = 0
+
+async def get_user(user_id: int) -> Optional[CachedUser]:
+    """Get a user's profile from cache, loading it from the database on a miss (None if no such user)"""
+    user = _cache.get(user_id)
+    if user is not None:
+        return user
+    
+    generation = _invalidations
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(*_COLUMNS).where(User.id == user_id))
+        row = result.first()
+    
+    if row is None:
+        return None
+    
+    user = CachedUser(*row)
+    if generation == _invalidations:
+        _cache.set(user_id, user)
+    return user
+
+def invalidate_user(user_id: int):
+    """Drop a user's cached profile; call after committing any change to their row"""
+    global _invalidations
+    _invalidations += 1
+    _cache.pop(user_id)
@@ -1,7 +1,26 @@
 """Astrology tools for Semantic Kernel with MCP HTTP server"""
 from semantic_kernel.functions import kernel_function
-from typing import Annotated
-import json
+from typing import Annotated, Optional
+from contextvars import ContextVar
+import orjson
+
+# Birth details of the user whose request is being answered (set per request by RudieAgent)
+current_birth_data: ContextVar[Optional[dict]] = ContextVar('current_birth_data', default=None)
+
+def _prediction_tool(name: str, description: str, birth_data_doc: str, result_doc: str):
+    """Build a kernel function that returns AstrologyService.<name>(birth details) as JSON"""
+    @kernel_function(name=name, description=description)
+    async def tool(
+        self,
+        birth_data: Annotated[str, birth_data_doc]
+    ) -> Annotated[str, result_doc]:
+        data = self._load_birth_data(birth_data)
+        result = await getattr(self.astrology_service, name)(data)
+        return self._to_json(result)
+    
+    tool.__name__ = tool.__qualname__ = name
+    tool.__doc__ = description
+    return tool
 
 class AstrologyTools:
     """Tools for accessing MCP-based astrology predictions"""
@@ -9,70 +28,49 @@ class AstrologyTools:
     def __init__(self, astrology_service):
         self.astrology_service = astrology_service
     
-    @kernel_function(
-        name="get_today_prediction",
-        description="Get today's astrological prediction and overall rating"
-    )
-    async def get_today_prediction(
-        self,
-        birth_data: Annotated[str, "JSON string with date_of_birth, time_of_birth, place_of_birth"]
-    ) -> Annotated[str, "Today's prediction with rating"]:
-        """Get today's prediction"""
-        data = json.loads(birth_data)
-        result = await self.astrology_service.get_today_prediction(data)
-        return json.dumps(result, indent=2)
+    def _load_birth_data(self, birth_data: str) -> dict:
+        """Use the request's known birth details, falling back to the model-supplied JSON"""
+        context_data = current_birth_data.get()
+        if context_data is not None:
+            return context_data
+        return orjson.loads(birth_data)
     
-    @kernel_function(
-        name="get_weekly_prediction",
-        description="Get 7-day weekly forecast"
-    )
-    async def get_weekly_prediction(
-        self,
-        birth_data: Annotated[str, "JSON string with birth details"]
-    ) -> Annotated[str, "Weekly forecast"]:
-        """Get weekly prediction"""
-        data = json.loads(birth_data)
-        result = await self.astrology_service.get_weekly_prediction(data)
-        return json.dumps(result, indent=2)
+    def _to_json(self, result) -> str:
+        """Serialize a tool result compactly; it is sent to Ollama and counts against the prompt"""
+        return orjson.dumps(result).decode()
     
-    @kernel_function(
-        name="get_love_prediction",
-        description="Get love and relationship predictions for the next period"
+    # Each prediction tool calls the AstrologyService method of the same name
+    get_today_prediction = _prediction_tool(
+        "get_today_prediction",
+        "Get today's astrological prediction and overall rating",
+        "JSON string with date_of_birth, time_of_birth, place_of_birth",
+        "Today's prediction with rating"
     )
-    async def get_love_prediction(
-        self,
-        birth_data: Annotated[str, "JSON string with birth details"]
-    ) -> Annotated[str, "Love predictions with best months"]:
-        """Get love predictions"""
-        data = json.loads(birth_data)
-        result = await self.astrology_service.get_love_prediction(data)
-        return json.dumps(result, indent=2)
-    
-    @kernel_function(
-        name="get_career_prediction",
-        description="Get career and professional predictions"
+    get_weekly_prediction = _prediction_tool(
+        "get_weekly_prediction",
+        "Get 7-day weekly forecast",
+        "JSON string with birth details",
+        "Weekly forecast"
     )
-    async def get_career_prediction(
-        self,
-        birth_data: Annotated[str, "JSON string with birth details"]
-    ) -> Annotated[str, "Career predictions"]:
-        """Get career predictions"""
-        data = json.loads(birth_data)
-        result = await self.astrology_service.get_career_prediction(data)
-        return json.dumps(result, indent=2)
-    
-    @kernel_function(
-        name="get_wealth_prediction",
-        description="Get financial and wealth predictions"
+    # The area predictions (love, career, wealth) differ only in name and wording
+    get_love_prediction = _prediction_tool(
+        "get_love_prediction",
+        "Get love and relationship predictions for the next period",
+        "JSON string with birth details",
+        "Love predictions with best months"
+    )
+    get_career_prediction = _prediction_tool(
+        "get_career_prediction",
+        "Get career and professional predictions",
+        "JSON string with birth details",
+        "Career predictions"
+    )
+    get_wealth_prediction = _prediction_tool(
+        "get_wealth_prediction",
+        "Get financial and wealth predictions",
+        "JSON string with birth details",
+        "Wealth predictions"
     )
-    async def get_wealth_prediction(
-        self,
-        birth_data: Annotated[str, "JSON string with birth details"]
-    ) -> Annotated[str, "Wealth predictions"]:
-        """Get wealth predictions"""
-        data = json.loads(birth_data)
-        result = await self.astrology_service.get_wealth_prediction(data)
-        return json.dumps(result, indent=2)
     
     @kernel_function(
         name="ask_specific_question",
@@ -85,10 +83,10 @@ class AstrologyTools:
         specific_date: Annotated[str, "Optional specific date in YYYY-MM-DD format"] = None
     ) -> Annotated[str, "Answer with success probability and recommendation"]:
         """Ask a specific question using wildcard endpoint"""
-        data = json.loads(birth_data)
+        data = self._load_birth_data(birth_data)
         result = await self.astrology_service.get_wildcard_prediction(
             data, 
             question, 
             specific_date
         )
-        return json.dumps(result, indent=2)
\ No newline at end of file
+        return self._to_json(result)
\ No newline at end of file
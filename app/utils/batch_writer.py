@@ -0,0 +1,89 @@
+"""Background writer that hands queued items to a flush coroutine in batches"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+class BatchWriter:
+    """Bounded queue drained by background tasks, each passing up to batch_size items at a time to flush
+
+    With window=0 a writer takes whatever is already waiting; otherwise it also waits up to
+    window seconds for more. Writers start on the first put(), so no event loop is needed
+    at construction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[Any]], Awaitable[None]],
+        workers: int = 1,
+        batch_size: int = 64,
+        window: float = 0.0,
+        maxsize: int = 1000
+    ):
+        self.name = name
+        self.flush = flush
+        self.workers = workers
+        self.batch_size = batch_size
+        self.window = window
+        self.maxsize = maxsize
+        self._queue = None
+        self._tasks = []
+
+    def put(self, item: Any) -> bool:
+        """Queue item for the next batch; returns False (dropping it) if the queue is full"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._tasks = [asyncio.create_task(self._writer_loop()) for _ in range(self.workers)]
+
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def close(self, timeout: float = 10.0):
+        """Wait up to timeout for queued items to be flushed, then stop the writers"""
+        if not self._tasks:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Dropping %s queued %s writes at shutdown", self._queue.qsize(), self.name)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _next_batch(self) -> List[Any]:
+        batch = [await self._queue.get()]
+        if self.window <= 0:
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _writer_loop(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.flush(batch)
+            except Exception as e:
+                logger.error("Error writing %s batch: %s", self.name, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
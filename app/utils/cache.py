@@ -0,0 +1,92 @@
+"""In-process TTL + LRU cache"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+class TTLCache:
+    """Bounded cache whose entries expire after ttl seconds, evicting least recently used first"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value for key, or default if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value for key, evicting the least recently used entry if full"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired entries return default)"""
+        entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def pop_prefix(self, prefix: str) -> int:
+        """Remove every entry whose (string) key starts with prefix; returns how many were removed"""
+        doomed = [key for key in self._data if isinstance(key, str) and key.startswith(prefix)]
+        for key in doomed:
+            del self._data[key]
+        return len(doomed)
+
+    def clear(self):
+        """Remove all entries"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def save(self, path: str) -> int:
+        """Write live entries to path as JSON (keys and values must be JSON-serializable); returns count"""
+        now = time.monotonic()
+        # Remaining lifetime rather than monotonic deadlines, which don't survive a restart
+        entries = [
+            [key, expires_at - now, value]
+            for key, (expires_at, value) in self._data.items()
+            if expires_at > now
+        ]
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.time(), 'entries': entries}, f)
+        os.replace(tmp_path, path)
+        return len(entries)
+    
+    def load(self, path: str) -> int:
+        """Restore entries written by save(), skipping any that expired meanwhile; returns count"""
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        
+        elapsed = max(0.0, time.time() - snapshot['saved_at'])
+        now = time.monotonic()
+        loaded = 0
+        for key, remaining, value in snapshot['entries']:
+            remaining -= elapsed
+            if remaining > 0:
+                self._data[key] = (now + remaining, value)
+                self._data.move_to_end(key)
+                loaded += 1
+        
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return min(loaded, len(self._data))
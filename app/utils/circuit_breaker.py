@@ -0,0 +1,44 @@
+"""Circuit breaker for calls to services that may be down"""
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Opens after fail_threshold consecutive failures; after reset_timeout one trial call may go through"""
+
+    def __init__(self, fail_threshold: int = 5, reset_timeout: float = 30.0):
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        """Return whether a call may be made now"""
+        state = self.state
+        if state == HALF_OPEN:
+            # Let this caller be the trial; others fail fast until it reports back
+            self.opened_at = time.monotonic()
+            return True
+        return state == CLOSED
+
+    def record_success(self):
+        """Close the circuit"""
+        self.failure_count = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        """Count a failure, opening (or re-opening) the circuit at the threshold"""
+        self.failure_count += 1
+        if self.failure_count >= self.fail_threshold:
+            self.opened_at = time.monotonic()
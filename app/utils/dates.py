@@ -0,0 +1,25 @@
+"""Date helpers for per-request code that only needs day precision"""
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Tuple
+
+# Today's date string, recomputed only after local midnight
+_today = {'value': '', 'expires_at': 0.0}
+
+def today_str() -> str:
+    """Return today's date as YYYY-MM-DD, cached until the next local midnight"""
+    now = time.time()
+    if now >= _today['expires_at']:
+        today = date.today()
+        _today['value'] = today.isoformat()
+        _today['expires_at'] = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+    return _today['value']
+
+@lru_cache(maxsize=32)
+def _date_range_from(start: str, days: int) -> Tuple[str, str]:
+    return start, (date.fromisoformat(start) + timedelta(days=days)).isoformat()
+
+def date_range(days: int) -> Tuple[str, str]:
+    """Return (today, today + days) as YYYY-MM-DD strings"""
+    return _date_range_from(today_str(), days)
@@ -0,0 +1,4 @@
+"""Shared HTTP request settings"""
+
+# Request bodies are serialized with orjson and sent as raw content
+JSON_HEADERS = {"Content-Type": "application/json"}
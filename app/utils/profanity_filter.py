@@ -23,6 +23,24 @@ PROFANITY_PATTERNS = [
     r's+u+c+k+s?',  # Add this
 ]
 
+# Aggressive language beyond profanity (removed 'suck' from here since it's in profanity)
+AGGRESSIVE_PATTERNS = [
+    (r'\bshut up\b', "aggressive command"),
+    (r'\bstupid\b', "insult"),
+    (r'\bidiot\b', "insult"),
+    (r'\buseless\b', "insult"),
+    (r'\bdumb\b', "insult"),
+    (r'\bworthless\b', "insult"),
+    (r'\bgarbage\b', "insult"),
+    (r'\btrash\b', "insult"),
+]
+
+# Compiled once at import; every incoming message is checked against these
+_PROFANITY_RES = [re.compile(pattern) for pattern in PROFANITY_PATTERNS]
+_AGGRESSIVE_RES = [(re.compile(pattern), reason) for pattern, reason in AGGRESSIVE_PATTERNS]
+_WHITESPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\b\w+\b')
+
 def contains_profanity(text: str) -> Tuple[bool, str]:
     """
     Check if text contains profanity
@@ -38,19 +56,19 @@ def contains_profanity(text: str) -> Tuple[bool, str]:
     
     # Remove common obfuscation
     text_normalized = text_lower.replace('*', '').replace('@', 'a').replace('$', 's')
-    text_normalized = re.sub(r'\s+', '', text_normalized)  # Remove spaces
+    text_normalized = _WHITESPACE_RE.sub('', text_normalized)  # Remove spaces
     
     # Check exact words
-    words = re.findall(r'\b\w+\b', text_lower)
+    words = _WORD_RE.findall(text_lower)
     for word in words:
         if word in PROFANITY_WORDS:
             return True, word
     
     # Check patterns
-    for pattern in PROFANITY_PATTERNS:
-        if re.search(pattern, text_normalized):
-            match = re.search(pattern, text_normalized)
-            return True, match.group() if match else "profanity"
+    for pattern in _PROFANITY_RES:
+        match = pattern.search(text_normalized)
+        if match:
+            return True, match.group()
     
     return False, ""
 
@@ -71,20 +89,9 @@ def is_rude_or_aggressive(text: str) -> Tuple[bool, str]:
     if has_profanity:
         return True, f"profanity: {word}"
     
-    # Check aggressive patterns (removed 'suck' from here since it's in profanity)
-    aggressive_patterns = [
-        (r'\bshut up\b', "aggressive command"),
-        (r'\bstupid\b', "insult"),
-        (r'\bidiot\b', "insult"),
-        (r'\buseless\b', "insult"),
-        (r'\bdumb\b', "insult"),
-        (r'\bworthless\b', "insult"),
-        (r'\bgarbage\b', "insult"),
-        (r'\btrash\b', "insult"),
-    ]
-    
-    for pattern, reason in aggressive_patterns:
-        if re.search(pattern, text_lower):
+    # Check aggressive patterns
+    for pattern, reason in _AGGRESSIVE_RES:
+        if pattern.search(text_lower):
             return True, reason
     
     return False, ""
\ No newline at end of file
@@ -5,13 +5,15 @@ import re
 
 from app.database import AsyncSessionLocal
 from app.models import User
+from app.services.user_cache import get_user, invalidate_user
 from app.utils.profanity_filter import is_rude_or_aggressive
 from config import get_settings
-from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_THINK_RE = re.compile(r'<think>.*?</think>\s*', re.DOTALL)
+
 class AstrologyWorker:
     def __init__(
         self,
@@ -25,6 +27,26 @@ class AstrologyWorker:
         self.astrology_service = astrology_service
         self.rudie_agent = rudie_agent
     
+    async def _should_encrypt(self, user_id: int) -> bool:
+        """Check if user has encryption enabled"""
+        user = await get_user(user_id)
+        return bool(user and user.encrypt_chats)
+    
+    async def _get_memory_data(self, user_id: int, text: str) -> str:
+        """Get memories for the query, or empty string if unavailable"""
+        try:
+            memories_result = await self.memory_service.get_memories(user_id, text)
+            
+            if memories_result and isinstance(memories_result, dict):
+                return memories_result.get("data", "")
+            
+            logger.warning(f"🧠 Invalid memories result: {type(memories_result)}")
+            return ""
+            
+        except Exception as e:
+            logger.warning(f"🧠 Failed to get memories, continuing without: {e}")
+            return ""
+    
     async def process_request(self, request_data: dict):
         """Process a single astrology request"""
         try:
@@ -34,7 +56,7 @@ class AstrologyWorker:
             
             if missing_fields:
                 logger.warning(f"⚠️ Skipping malformed message - missing fields: {missing_fields}")
-                logger.debug(f"Message data: {request_data}")
+                logger.debug("Message data: %s", request_data)
                 return
             
             # Validate user_context
@@ -50,20 +72,6 @@ class AstrologyWorker:
             chat_id = request_data['chat_id']
             text = request_data['message']
             
-            # Check if user has encryption enabled for logging
-            async with AsyncSessionLocal() as db:
-                stmt = select(User).where(User.id == user_id)
-                result = await db.execute(stmt)
-                user = result.scalar_one_or_none()
-                
-                should_encrypt = user and user.encrypt_chats
-                
-                # Conditional logging
-                if should_encrypt:
-                    logger.info(f"🔮 Processing encrypted query for user {user_id}")
-                else:
-                    logger.info(f"🔮 Processing astrology query for user {user_id}: {text[:50]}...")
-
             request_id = request_data.get('request_id', 'unknown')
             
             # Skip test messages
@@ -80,9 +88,7 @@ class AstrologyWorker:
                     
                     # Update user strikes
                     async with AsyncSessionLocal() as db:
-                        stmt = select(User).where(User.id == user_id)
-                        result = await db.execute(stmt)
-                        user = result.scalar_one_or_none()
+                        user = await db.get(User, user_id)
                         
                         if user:
                             user.strikes += 1
@@ -92,6 +98,7 @@ class AstrologyWorker:
                             if current_strikes >= settings.max_strikes:
                                 user.is_active = False
                                 await db.commit()
+                                invalidate_user(user_id)
                                 
                                 logger.warning(f"🚫 User {user_id} deactivated - max strikes reached ({current_strikes}/{settings.max_strikes})")
                                 
@@ -107,6 +114,7 @@ Take care! 🌿"""
                                 return
                             else:
                                 await db.commit()
+                                invalidate_user(user_id)
                                 
                                 logger.info(f"⚠️ Strike added to user {user_id}: {current_strikes}/{settings.max_strikes}")
                                 
@@ -129,22 +137,18 @@ Let's start fresh - what would you like to know about your stars? ✨"""
             )
             
             try:
-                logger.info(f"🔮 Processing astrology query for user {user_id}")
+                # Encryption lookup (for logging) and memories are independent - fetch together
+                should_encrypt, memory_data = await asyncio.gather(
+                    self._should_encrypt(user_id),
+                    self._get_memory_data(user_id, text)
+                )
                 
-                # Get memories
-                try:
-                    memories_result = await self.memory_service.get_memories(user_id, text)
-                    memory_data = ""
-                    
-                    if memories_result and isinstance(memories_result, dict):
-                        memory_data = memories_result.get("data", "")
-                    else:
-                        logger.warning(f"🧠 Invalid memories result: {type(memories_result)}")
-                        memory_data = ""
-                        
-                except Exception as e:
-                    logger.warning(f"🧠 Failed to get memories, continuing without: {e}")
-                    memory_data = ""
+                # Conditional logging
+                if should_encrypt:
+                    logger.info(f"🔮 Processing encrypted query for user {user_id}")
+                else:
+                    # %.50s truncates during formatting, so no slice is built when INFO is off
+                    logger.info("🔮 Processing astrology query for user %s: %.50s...", user_id, text)
                 
                 # Add memories to context
                 user_context['memories'] = memory_data
@@ -153,11 +157,14 @@ Let's start fresh - what would you like to know about your stars? ✨"""
                 response = await self.rudie_agent.generate_response(
                     user_message=text,
                     user_context=user_context,
-                    astrology_service=self.astrology_service
+                    astrology_service=self.astrology_service,
+                    user_id=user_id,
+                    cacheable=not should_encrypt
                 )
                 
                 # Clean response
-                response = re.sub(r'<think>.*?</think>\s*', '', response, flags=re.DOTALL)
+                if '<think>' in response:
+                    response = _THINK_RE.sub('', response)
                 response = response.strip()
                 
                 # Stop typing
@@ -168,22 +175,12 @@ Let's start fresh - what would you like to know about your stars? ✨"""
                 # Send response
                 await self.telegram_service.send_message(chat_id, response)
                 
-                # Save to database and Redis
-                async with AsyncSessionLocal() as db:
-                    await self.telegram_service.save_chat_to_db(db, user_id, "user", text)
-                    await self.telegram_service.save_chat_to_db(db, user_id, "bot", response)
-                
-                self.telegram_service.save_chat_to_redis(user_id, "user", text)
-                self.telegram_service.save_chat_to_redis(user_id, "bot", response)
+                # Save to database (batched in the background) and Redis
+                self.telegram_service.enqueue_chats(user_id, [("user", text), ("bot", response)])
+                await self.telegram_service.save_turn_to_redis(user_id, text, response)
                 
                 # Add to memory (in background)
-                async def add_memory_safe():
-                    try:
-                        await self.memory_service.add_memory(user_id, text, response)
-                    except Exception as e:
-                        logger.error(f"Failed to add memory: {e}")
-                
-                asyncio.create_task(add_memory_safe())
+                self.memory_service.enqueue_add(user_id, text, response)
                 
                 logger.info(f"✅ Completed request {request_id} for user {user_id}")
                 
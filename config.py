@@ -30,6 +30,8 @@ class Settings(BaseSettings):
     postgres_db: str
     postgres_user: str
     postgres_password: str
+    postgres_pool_size: int = 10
+    postgres_max_overflow: int = 20
     
     # Redis
     redis_host: str
@@ -45,7 +47,8 @@ class Settings(BaseSettings):
     rabbitmq_password: str = "guest"
     rabbitmq_vhost: str = "/"
     rabbitmq_queue: str = "astrology_requests"
-    rabbitmq_workers: int = 1
+    rabbitmq_workers: int = 1  # Requests processed concurrently
+    rabbitmq_prefetch: int = 0  # Unacked messages buffered (0 = same as rabbitmq_workers)
     
     # Ollama
     ollama_host: str
@@ -53,13 +56,22 @@ class Settings(BaseSettings):
     enable_thinking: bool = True
     thinking_max_tokens: int = 2000
     thinking_temperature: float = 0.7
+    verbose_prompt: bool = True  # Include worked example replies in the system prompt
+    llm_cache_ttl: int = 3600  # Seconds to reuse a reply for the same question (0 disables)
+    llm_cache_size: int = 1024
+    llm_cache_path: str = ""  # File to persist the reply cache across restarts (empty disables)
     
     # Services
     mem0_service_url: str
+    mem0_cache_ttl: int = 60  # Seconds to reuse a memory lookup for the same user and message (0 disables)
+    mem0_batch_max: int = 32  # Queued memory writes one writer sends together
     astrology_api_url: str
+    prediction_cache_ttl: int = 21600  # Seconds to reuse an MCP prediction for the same birth data and day (0 disables)
+    prediction_cache_size: int = 2048
     
     # User Management
     max_strikes: int = 3
+    user_cache_ttl: int = 300  # Seconds a user's profile is cached in-process (out-of-process edits apply after this)
     enable_profanity_filter: bool = True
     
     # Chat Encryption
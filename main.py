@@ -1,17 +1,20 @@
 """Main application entry point"""
 import asyncio
 import logging
+import os
 import sys
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-import httpx
 
 from config import get_settings
 from app.services.telegram_service import TelegramService
 from app.services.memory_service import MemoryService
 from app.services.astrology_service import AstrologyService
 from app.services.queue_service import QueueService
+from app.services.ollama_client import close_ollama_client, warm_ollama_model
+from app.services.redis_client import close_redis_client
+from app.database import engine
 from app.agents.rudie_agent import RudieAgent
 from app.agents.extraction_agent import ExtractionAgent
 from app.workers.astrology_worker import AstrologyWorker
@@ -62,7 +65,7 @@ async def _handle_start(update, context):
 
 async def _handle_help(update, context):
     """Wrapper for help handler"""
-    return await handle_help(update, context)
+    return await handle_help(update, context, telegram_service)
 
 async def _handle_info(update, context):
     """Wrapper for info handler"""
@@ -70,7 +73,7 @@ async def _handle_info(update, context):
 
 async def _handle_clear(update, context):
     """Wrapper for clear handler"""
-    return await handle_clear(update, context, telegram_service, memory_service)
+    return await handle_clear(update, context, telegram_service, memory_service, rudie_agent)
 
 async def _handle_message(update, context):
     """Wrapper for message handler"""
@@ -91,13 +94,12 @@ async def lifespan(app: FastAPI):
     # Test Mem0 connection
     try:
         logger.info("🧠 Testing Mem0 connection...")
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{settings.mem0_service_url}/health")
-            logger.info(f"🧠 Mem0 service responding: HTTP {response.status_code}")
-            if response.status_code == 200:
-                logger.info(f"✅ Mem0 service is healthy")
-            else:
-                logger.warning(f"⚠️  Mem0 service returned non-200 status")
+        response = await memory_service.client.get("/health", timeout=5.0)
+        logger.info(f"🧠 Mem0 service responding: HTTP {response.status_code}")
+        if response.status_code == 200:
+            logger.info(f"✅ Mem0 service is healthy")
+        else:
+            logger.warning(f"⚠️  Mem0 service returned non-200 status")
     except Exception as e:
         logger.warning(f"🧠 Could not connect to Mem0 service: {e}")
         logger.warning("⚠️  Bot will continue but memory features may not work")
@@ -116,6 +118,17 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Encryption initialization failed: {e}")
         logger.error("⚠️  Chat encryption will not work!")
     
+    # Load the model in the background while the rest of startup runs
+    warmup_task = asyncio.create_task(warm_ollama_model(), name="ollama-warmup")
+    
+    # Restore cached replies from the last run
+    if settings.llm_cache_path and os.path.exists(settings.llm_cache_path):
+        try:
+            loaded = rudie_agent.response_cache.load(settings.llm_cache_path)
+            logger.info(f"💾 Restored {loaded} cached replies")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not restore reply cache: {e}")
+    
     # Connect to RabbitMQ
     try:
         await queue_service.connect()
@@ -123,15 +136,11 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Failed to connect to RabbitMQ: {e}")
         raise
     
-    # Start multiple consumers based on RABBITMQ_WORKERS
-    consumer_tasks = []
-    for worker_id in range(settings.rabbitmq_workers):
-        logger.info(f"👷 Starting worker {worker_id + 1}/{settings.rabbitmq_workers}")
-        task = asyncio.create_task(
-            queue_service.start_consumer(astrology_worker.process_request),
-            name=f"worker-{worker_id}"
-        )
-        consumer_tasks.append(task)
+    # One consumer runs up to RABBITMQ_WORKERS requests concurrently
+    consumer_task = asyncio.create_task(
+        queue_service.start_consumer(astrology_worker.process_request),
+        name="queue-consumer"
+    )
     
     logger.info(f"✅ Started {settings.rabbitmq_workers} worker(s)")
     
@@ -155,25 +164,45 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🛑 Shutting down astrology bot...")
     
-    # Stop all consumers
-    for task in consumer_tasks:
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+    # Stop the consumer; it lets in-flight requests finish first
+    consumer_task.cancel()
+    try:
+        await consumer_task
+    except asyncio.CancelledError:
+        pass
     
     logger.info("✅ All workers stopped")
     
-    # Disconnect from RabbitMQ
-    await queue_service.disconnect()
+    if not warmup_task.done():
+        warmup_task.cancel()
     
-    # Stop Telegram bot
+    # Stop Telegram before closing the clients its handlers use (send_raw, Mem0, Redis, Ollama)
     if telegram_service.application:
         await telegram_service.application.updater.stop()
         await telegram_service.application.stop()
         await telegram_service.application.shutdown()
     logger.info("✅ Telegram bot stopped")
+    
+    # Disconnect from RabbitMQ
+    await queue_service.disconnect()
+    
+    # Close shared HTTP connection pools; the services first flush their queued
+    # Mem0 and chat-history writes, so the database and Redis go last
+    await close_ollama_client()
+    await memory_service.close()
+    await astrology_service.close()
+    await telegram_service.close()
+    await engine.dispose()
+    await close_redis_client()
+    
+    # Persist cached replies for the next run
+    if settings.llm_cache_path:
+        try:
+            saved = rudie_agent.response_cache.save(settings.llm_cache_path)
+            logger.info(f"💾 Saved {saved} cached replies")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not save reply cache: {e}")
+    
 
 # Use lifespan
 app = FastAPI(title="Astrology Bot", lifespan=lifespan)
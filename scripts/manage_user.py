@@ -15,9 +15,13 @@ settings = get_settings()  # Add this line
 async def get_user(user_id: int):
     """Get user details"""
     async with AsyncSessionLocal() as db:
-        stmt = select(User).where(User.id == user_id)
+        # Only the printed columns, not the horoscope JSON blobs
+        stmt = select(
+            User.id, User.first_name, User.username, User.is_active,
+            User.priority, User.strikes, User.encrypt_chats
+        ).where(User.id == user_id)
         result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
+        user = result.first()
         
         if user:
             print(f"\n📊 User: {user.first_name} (ID: {user.id})")
@@ -109,9 +113,11 @@ async def reset_strikes(user_id: int):
 async def list_users():
     """List all users"""
     async with AsyncSessionLocal() as db:
-        stmt = select(User).order_by(User.priority, User.id)
+        stmt = select(
+            User.id, User.first_name, User.is_active, User.priority, User.strikes
+        ).order_by(User.priority, User.id)
         result = await db.execute(stmt)
-        users = result.scalars().all()
+        users = result.all()
         
         print(f"\n📋 Total Users: {len(users)}\n")
         for user in users:
@@ -102,10 +102,19 @@ async def main():
         'test_connections',
         'test_rabbitmq',
         'test_mem0_connection',
+        'test_single_flight',
+        'test_batch_writer',
+        'test_memory_replay',
+        'test_rate_limiter',
     ]
     
     sync_tests = [
         'test_profanity_filter',
+        'test_response_cleanup',
+        'test_cache',
+        'test_tool_routing',
+        'test_circuit_breaker',
+        'test_message_fitting',
     ]
     
     results = {}
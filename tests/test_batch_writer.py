@@ -0,0 +1,76 @@
+"""Test the background batch writer"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.batch_writer import BatchWriter
+
+def check(condition: bool, description: str) -> bool:
+    """Print a PASS/FAIL line and return the outcome"""
+    print(f"{'✅ PASS' if condition else '❌ FAIL'}: {description}")
+    return condition
+
+async def test_batch_writer():
+    """Test batching, draining on close, a full queue and flush errors"""
+    print("\n🧪 Testing BatchWriter\n")
+
+    results = []
+    batches = []
+
+    async def flush(batch):
+        await asyncio.sleep(0.01)
+        batches.append(list(batch))
+
+    # Items arriving within the window share a batch
+    writer = BatchWriter("test", flush, batch_size=10, window=0.05)
+    for i in range(5):
+        writer.put(i)
+    await writer.close()
+    results.append(check(batches == [[0, 1, 2, 3, 4]], "Items within the window go out as one batch"))
+
+    # close() flushes everything still queued
+    batches.clear()
+    writer = BatchWriter("test", flush, workers=2, batch_size=3)
+    for i in range(10):
+        writer.put(i)
+    await writer.close()
+    flushed = sorted(item for batch in batches for item in batch)
+    results.append(check(flushed == list(range(10)), "close() drains queued items"))
+    results.append(check(all(len(batch) <= 3 for batch in batches), "Batches respect batch_size"))
+
+    # A full queue rejects new items instead of blocking
+    writer = BatchWriter("test", flush, maxsize=2)
+    accepted = [writer.put(i) for i in range(3)]
+    results.append(check(accepted == [True, True, False], "Full queue rejects items"))
+    await writer.close()
+
+    # A failing flush doesn't stop the writer
+    calls = 0
+
+    async def flaky(batch):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("database down")
+
+    writer = BatchWriter("test", flaky)
+    writer.put("a")
+    await asyncio.sleep(0.01)
+    writer.put("b")
+    await writer.close()
+    results.append(check(calls == 2, "Writer keeps going after a failed flush"))
+
+    passed = sum(results)
+    failed = len(results) - passed
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+async def main():
+    """Main entry point for test runner"""
+    return await test_batch_writer()
+
+if __name__ == "__main__":
+    success = asyncio.run(test_batch_writer())
+    sys.exit(0 if success else 1)
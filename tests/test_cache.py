@@ -0,0 +1,100 @@
+"""Test the reply cache (TTLCache)"""
+import sys
+import os
+import json
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.cache import TTLCache
+
+def check(condition: bool, description: str) -> bool:
+    """Print a PASS/FAIL line and return the outcome"""
+    print(f"{'✅ PASS' if condition else '❌ FAIL'}: {description}")
+    return condition
+
+def test_cache():
+    """Test expiry, LRU eviction, per-user eviction and save/load round-tripping"""
+    print("\n🧪 Testing Reply Cache\n")
+
+    results = []
+
+    # Expiry
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("1:a", "reply")
+    results.append(check(cache.get("1:a") == "reply", "Entry readable before ttl"))
+    time.sleep(0.1)
+    results.append(check(cache.get("1:a") is None, "Entry gone after ttl"))
+
+    # LRU eviction
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    results.append(check(cache.get("b") is None and cache.get("a") == 1, "Least recently used entry evicted"))
+
+    # Per-user eviction (/clear)
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("1:a", "x")
+    cache.set("1:b", "y")
+    cache.set("12:a", "z")
+    removed = cache.pop_prefix("1:")
+    results.append(check(removed == 2 and cache.get("12:a") == "z", "pop_prefix removes only that user's entries"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.json")
+
+        # Round trip
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("1:a", "first reply")
+        cache.set("2:b", "second reply")
+        saved = cache.save(path)
+        restored = TTLCache(maxsize=10, ttl=60)
+        loaded = restored.load(path)
+        results.append(check(
+            saved == 2 and loaded == 2
+            and restored.get("1:a") == "first reply" and restored.get("2:b") == "second reply",
+            "save/load round-trips entries"
+        ))
+
+        # Expired entries are not saved
+        cache = TTLCache(maxsize=10, ttl=0.05)
+        cache.set("1:a", "stale")
+        time.sleep(0.1)
+        results.append(check(cache.save(path) == 0, "Expired entries are not saved"))
+
+        # Time spent down counts against the remaining lifetime
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("1:a", "old")
+        cache.save(path)
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        snapshot['saved_at'] -= 120
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        restored = TTLCache(maxsize=10, ttl=60)
+        results.append(check(restored.load(path) == 0 and restored.get("1:a") is None, "Entries that expired while down are skipped"))
+
+        # Loading more than maxsize keeps the newest
+        cache = TTLCache(maxsize=10, ttl=60)
+        for i in range(5):
+            cache.set(f"1:{i}", i)
+        cache.save(path)
+        restored = TTLCache(maxsize=3, ttl=60)
+        loaded = restored.load(path)
+        results.append(check(loaded == 3 and restored.get("1:0") is None and restored.get("1:4") == 4, "load respects maxsize"))
+
+    passed = sum(results)
+    failed = len(results) - passed
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+def main():
+    """Main entry point for test runner"""
+    return test_cache()
+
+if __name__ == "__main__":
+    success = test_cache()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,65 @@
+"""Test the circuit breaker"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+def check(condition: bool, description: str) -> bool:
+    """Print a PASS/FAIL line and return the outcome"""
+    print(f"{'✅ PASS' if condition else '❌ FAIL'}: {description}")
+    return condition
+
+def test_circuit_breaker():
+    """Test opening after N failures, half-open after the cooldown, and closing on success"""
+    print("\n🧪 Testing Circuit Breaker\n")
+
+    results = []
+    breaker = CircuitBreaker(fail_threshold=3, reset_timeout=0.05)
+
+    # Stays closed below the threshold
+    breaker.record_failure()
+    breaker.record_failure()
+    results.append(check(breaker.state == CLOSED and breaker.allow(), "Closed below the failure threshold"))
+
+    # Opens at the threshold and fails fast
+    breaker.record_failure()
+    results.append(check(breaker.state == OPEN and not breaker.allow(), "Opens after 3 failures"))
+
+    # Half-open after the cooldown: one trial call, others still fail fast
+    time.sleep(0.06)
+    results.append(check(breaker.state == HALF_OPEN, "Half-open after the cooldown"))
+    results.append(check(breaker.allow(), "Trial call allowed when half-open"))
+    results.append(check(not breaker.allow(), "Other calls fail fast during the trial"))
+
+    # A failed trial re-opens the circuit
+    breaker.record_failure()
+    results.append(check(breaker.state == OPEN, "Failed trial re-opens"))
+
+    # A successful trial closes it and resets the count
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    results.append(check(breaker.state == CLOSED and breaker.failure_count == 0, "Successful trial closes"))
+
+    # A success in between resets the consecutive-failure count
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    results.append(check(breaker.state == CLOSED, "Only consecutive failures count"))
+
+    passed = sum(results)
+    failed = len(results) - passed
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+def main():
+    """Main entry point for test runner"""
+    return test_circuit_breaker()
+
+if __name__ == "__main__":
+    success = test_circuit_breaker()
+    sys.exit(0 if success else 1)
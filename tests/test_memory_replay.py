@@ -0,0 +1,78 @@
+"""Test that memories held while Mem0 is down are bounded and replayed in order"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from app.services.memory_service import MemoryService
+
+def check(condition: bool, description: str) -> bool:
+    """Print a PASS/FAIL line and return the outcome"""
+    print(f"{'✅ PASS' if condition else '❌ FAIL'}: {description}")
+    return condition
+
+class FakeMem0:
+    """Stands in for the Mem0 /add endpoint; records who was added, or fails while down"""
+
+    def __init__(self):
+        self.down = True
+        self.added = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.down:
+            raise httpx.ConnectError("Mem0 unreachable", request=request)
+        self.added.append(httpx.Response(200, content=request.content).json()["user_id"])
+        return httpx.Response(200, json={"status": "ok"})
+
+async def test_memory_replay():
+    """Test the held-memory deque's bound and replay order"""
+    print("\n🧪 Testing Held Memory Replay\n")
+
+    results = []
+    mem0 = FakeMem0()
+    service = MemoryService()
+    await service.client.aclose()
+    service.client = httpx.AsyncClient(base_url="http://mem0", transport=httpx.MockTransport(mem0.handle))
+
+    try:
+        # Failures while Mem0 is down hold the exchange, then open the circuit
+        limit = service._pending_adds.maxlen
+        for user_id in range(limit + 5):
+            await service.add_memory(user_id, "question", "answer")
+        results.append(check(len(service._pending_adds) == limit, f"Held memories are capped at {limit}"))
+        results.append(check(
+            service._pending_adds[0][0] == 5 and service._pending_adds[-1][0] == limit + 4,
+            "Oldest held memories are dropped first"
+        ))
+
+        # A failed replay keeps the order of what's still held
+        service._breaker.record_success()
+        await service._replay_pending_adds()
+        results.append(check(
+            [item[0] for item in list(service._pending_adds)[:3]] == [5, 6, 7],
+            "Failed replay leaves held memories in order"
+        ))
+
+        # Once Mem0 is back, the next write goes out and the held ones follow in order
+        mem0.down = False
+        service._breaker.record_success()
+        await service.add_memory(-1, "question", "answer")
+        results.append(check(mem0.added == [-1] + list(range(5, limit + 5)), "Held memories replay oldest first"))
+        results.append(check(len(service._pending_adds) == 0, "Nothing left held after replay"))
+    finally:
+        await service.close()
+
+    passed = sum(results)
+    failed = len(results) - passed
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+async def main():
+    """Main entry point for test runner"""
+    return await test_memory_replay()
+
+if __name__ == "__main__":
+    success = asyncio.run(test_memory_replay())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,76 @@
+"""Test truncation of replies to Telegram's message length limit"""
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.telegram_service import (
+    _fit_message, TELEGRAM_MAX_LENGTH, TRUNCATION_BUDGET, TRUNCATION_SUFFIX
+)
+
+def utf16_length(text: str) -> int:
+    """Length as Telegram counts it, in UTF-16 code units"""
+    return len(text.encode('utf-16-le')) // 2
+
+def test_message_fitting():
+    """Test that long replies are cut to the limit without splitting a surrogate pair"""
+    print("\n🧪 Testing Message Fitting\n")
+
+    test_cases = [
+        # (text, expected, description)
+        ("Your stars look bright ✨", "Your stars look bright ✨", "Short message unchanged"),
+        ("a" * TELEGRAM_MAX_LENGTH, "a" * TELEGRAM_MAX_LENGTH, "Exactly at the limit unchanged"),
+        (
+            "🌟" * (TELEGRAM_MAX_LENGTH // 2),
+            "🌟" * (TELEGRAM_MAX_LENGTH // 2),
+            "Emoji exactly at the limit unchanged"
+        ),
+        (
+            "a" * (TELEGRAM_MAX_LENGTH + 1),
+            "a" * TRUNCATION_BUDGET + TRUNCATION_SUFFIX,
+            "One unit over is truncated"
+        ),
+        (
+            # The emoji's two UTF-16 units sit either side of the cut
+            "a" * (TRUNCATION_BUDGET - 1) + "🌟" + "b" * 100,
+            "a" * (TRUNCATION_BUDGET - 1) + TRUNCATION_SUFFIX,
+            "Emoji straddling the cut is dropped whole"
+        ),
+        (
+            "a" * (TRUNCATION_BUDGET - 2) + "🌟" + "b" * 100,
+            "a" * (TRUNCATION_BUDGET - 2) + "🌟" + TRUNCATION_SUFFIX,
+            "Emoji ending at the cut is kept"
+        ),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for text, expected, description in test_cases:
+        result = _fit_message(text)
+        # A lone surrogate can't be encoded as UTF-8, which is how the reply is sent
+        try:
+            result.encode('utf-8')
+            whole = True
+        except UnicodeEncodeError:
+            whole = False
+
+        if result == expected and whole and utf16_length(result) <= TELEGRAM_MAX_LENGTH:
+            print(f"✅ PASS: {description}")
+            passed += 1
+        else:
+            print(f"❌ FAIL: {description}")
+            print(f"   Length: {utf16_length(result)} UTF-16 units, no lone surrogates: {whole}")
+            print(f"   Tail: {result[-40:]!r}")
+            failed += 1
+
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+def main():
+    """Main entry point for test runner"""
+    return test_message_fitting()
+
+if __name__ == "__main__":
+    success = test_message_fitting()
+    sys.exit(0 if success else 1)
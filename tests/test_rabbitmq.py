@@ -266,7 +266,6 @@ async def test_queue_service():
         request_id = await queue_service.publish_request(test_request)
         print_test("QueueService Publish", True, f"Published request: {request_id}")
         
-        # Queue size is always 0 in our implementation
         queue_size = await queue_service.get_queue_size()
         print_test("QueueService Queue Size", True, f"Queue size check works (returns {queue_size})")
         
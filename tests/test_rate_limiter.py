@@ -0,0 +1,73 @@
+"""Test the outbound Telegram token bucket"""
+import asyncio
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.telegram_rate_limiter import TokenBucket
+
+def check(condition: bool, description: str) -> bool:
+    """Print a PASS/FAIL line and return the outcome"""
+    print(f"{'✅ PASS' if condition else '❌ FAIL'}: {description}")
+    return condition
+
+async def test_rate_limiter():
+    """Test burst capacity, refill pacing, arrival order and 429 penalties"""
+    print("\n🧪 Testing Token Bucket\n")
+
+    results = []
+
+    # A full bucket lets a burst of `capacity` sends through at once
+    bucket = TokenBucket(rate=20, capacity=3)
+    start = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    results.append(check(time.monotonic() - start < 0.02, "Burst up to capacity doesn't wait"))
+
+    # After the burst, sends are paced at `rate`
+    start = time.monotonic()
+    for _ in range(2):
+        await bucket.acquire()
+    elapsed = time.monotonic() - start
+    results.append(check(0.08 <= elapsed < 0.2, f"Sends after the burst are paced ({elapsed:.3f}s for 2 at 20/s)"))
+
+    # Waiters are served in arrival order
+    bucket = TokenBucket(rate=50, capacity=1)
+    order = []
+
+    async def send(n):
+        await bucket.acquire()
+        order.append(n)
+
+    tasks = []
+    for n in range(5):
+        tasks.append(asyncio.create_task(send(n)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    results.append(check(order == [0, 1, 2, 3, 4], "Waiters are served in arrival order"))
+
+    # penalize() holds every sender and doesn't leave a burst saved up
+    bucket = TokenBucket(rate=20, capacity=3)
+    bucket.penalize(0.1)
+    start = time.monotonic()
+    await bucket.acquire()
+    first = time.monotonic() - start
+    await bucket.acquire()
+    second = time.monotonic() - start
+    results.append(check(first >= 0.1, f"Send waits out retry_after ({first:.3f}s)"))
+    results.append(check(second - first >= 0.04, "Bucket starts empty when the block lifts"))
+
+    passed = sum(results)
+    failed = len(results) - passed
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+async def main():
+    """Main entry point for test runner"""
+    return await test_rate_limiter()
+
+if __name__ == "__main__":
+    success = asyncio.run(test_rate_limiter())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,72 @@
+"""Test in-flight call sharing (SingleFlight)"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.single_flight import SingleFlight
+
+def check(condition: bool, description: str) -> bool:
+    """Print a PASS/FAIL line and return the outcome"""
+    print(f"{'✅ PASS' if condition else '❌ FAIL'}: {description}")
+    return condition
+
+async def test_single_flight():
+    """Test that concurrent callers share one call and survive each other's cancellation"""
+    print("\n🧪 Testing SingleFlight\n")
+
+    results = []
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def lookup():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "answer"
+
+    # Three callers for the same key share a single call
+    waiters = [asyncio.create_task(flight.run("key", lookup)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    results.append(check(calls == 1 and "key" in flight, "Concurrent callers share one call"))
+
+    # Cancelling one caller leaves the call running for the others
+    waiters[0].cancel()
+    await asyncio.sleep(0.01)
+    release.set()
+    outcomes = await asyncio.gather(*waiters, return_exceptions=True)
+    results.append(check(isinstance(outcomes[0], asyncio.CancelledError), "Cancelled caller sees CancelledError"))
+    results.append(check(outcomes[1:] == ["answer", "answer"], "Other callers still get the result"))
+
+    # Finished calls are forgotten, so the next caller starts a fresh one
+    await asyncio.sleep(0)
+    results.append(check(len(flight) == 0, "Finished call is removed"))
+    results.append(check(await flight.run("key", lookup) == "answer" and calls == 2, "Later caller starts a new call"))
+
+    # Errors reach every caller and don't stick
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    outcomes = await asyncio.gather(
+        flight.run("bad", failing), flight.run("bad", failing), return_exceptions=True
+    )
+    results.append(check(
+        all(isinstance(outcome, ValueError) for outcome in outcomes) and "bad" not in flight,
+        "Errors propagate to all callers and are not kept"
+    ))
+
+    passed = sum(results)
+    failed = len(results) - passed
+    print(f"\n📊 Results: {passed} passed, {failed} failed")
+    return failed == 0
+
+async def main():
+    """Main entry point for test runner"""
+    return await test_single_flight()
+
+if __name__ == "__main__":
+    success = asyncio.run(test_single_flight())
+    sys.exit(0 if success else 1)